@@ -1,6 +1,8 @@
 import aiohttp
 import asyncio
-from typing import Dict, Set, Optional, List, Tuple
+from itertools import islice
+from operator import attrgetter
+from typing import Dict, Set, FrozenSet, Optional, List, Tuple
 from dataclasses import dataclass
 from configs_continuous import (
     BESTCHANGE_API_KEY,
@@ -11,11 +13,15 @@ from configs_continuous import (
     RETRY_DELAY,
     REQUEST_TIMEOUT
 )
+from utils import json_loads
 
 
 @dataclass
 class RateInfo:
     """Информация о курсе обмена"""
+    # __slots__ вместо __dict__: курсов десятки тысяч, так меньше памяти и быстрее доступ к полям
+    __slots__ = ('rate', 'rankrate', 'exchanger', 'exchanger_id', 'reserve', 'give_min', 'give_max', 'marks')
+
     rate: float
     rankrate: float  # Курс с учетом комиссий для $300 (в формате GIVE)
     exchanger: str
@@ -42,6 +48,14 @@ class BestChangeClientAsync:
         self.crypto_currencies: Dict[str, int] = {}
         self.changers: Dict[int, Dict] = {}
         self.rates: Dict[str, Dict[str, List[RateInfo]]] = {}
+        # Счётчик версий данных: увеличивается при каждом обновлении курсов/валют,
+        # по нему анализатор понимает, что пересчитывать нечего
+        self.data_version = 0
+        # Версия списка валют: меняется только при загрузке валют, не курсов
+        self.currencies_version = 0
+        # Предложения направлений отсортированы по rankrate (load_rates с use_rankrate=True);
+        # иначе - по rate, и первое предложение не обязательно лучшее по rankrate
+        self.rates_sorted_by_rankrate = True
 
         # Настройки из конфига с валидацией (оптимизировано для скорости)
         # Увеличено до 20 параллельных запросов для ускорения
@@ -61,8 +75,8 @@ class BestChangeClientAsync:
         self.error_count = 0
         self.rate_limit_count = 0
 
-        # Для отслеживания последнего запроса (rate limiting)
-        self._last_request_time = 0
+        # Время, начиная с которого свободен следующий слот запроса (rate limiting)
+        self._next_request_time = 0.0
         self._min_request_interval = 0.05
 
     async def __aenter__(self):
@@ -102,14 +116,19 @@ class BestChangeClientAsync:
             self.session = None
 
     async def _rate_limit_wait(self):
-        """Умная задержка для предотвращения rate limit"""
-        now = asyncio.get_event_loop().time()
-        time_since_last = now - self._last_request_time
+        """
+        Умная задержка для предотвращения rate limit
 
-        if time_since_last < self._min_request_interval:
-            await asyncio.sleep(self._min_request_interval - time_since_last)
+        Каждый вызов резервирует свой слот сразу (без await между чтением и записью),
+        поэтому параллельные запросы разносятся ровно на _min_request_interval
+        и спят ровно до своего слота, без опроса и без блокировки
+        """
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_request_time)
+        self._next_request_time = slot + self._min_request_interval
 
-        self._last_request_time = asyncio.get_event_loop().time()
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
     async def _make_request(self, endpoint: str, retries: int = None) -> Optional[Dict]:
         """Выполняет HTTP запрос к API с улучшенной обработкой ошибок и оптимизацией"""
@@ -154,13 +173,16 @@ class BestChangeClientAsync:
                         print(f"[BestChange] ❌ HTTP {response.status} для {endpoint}")
                         return None
 
-                    try:
-                        data = await response.json()
-                        return data
-                    except aiohttp.ContentTypeError:
-                        self.error_count += 1
-                        print(f"[BestChange] ❌ Невалидный JSON для {endpoint}")
-                        return None
+                    # Читаем тело целиком и сразу возвращаем соединение в пул
+                    body = await response.read()
+
+                # Разбираем JSON уже после освобождения соединения
+                try:
+                    return json_loads(body)
+                except ValueError:
+                    self.error_count += 1
+                    print(f"[BestChange] ❌ Невалидный JSON для {endpoint}")
+                    return None
 
             except asyncio.TimeoutError:
                 if attempt < retries:
@@ -213,6 +235,8 @@ class BestChangeClientAsync:
             if currency.get('crypto', False) and code:
                 self.crypto_currencies[code] = currency_id
 
+        self.data_version += 1
+        self.currencies_version += 1
         print(f"[BestChange] ✅ Загружено валют: {len(self.currencies)} (крипто: {len(self.crypto_currencies)})")
 
     async def load_exchangers(self):
@@ -263,6 +287,7 @@ class BestChangeClientAsync:
             use_rankrate: Использовать rankrate вместо rate (учитывает комиссии)
         """
         self.rates.clear()
+        self.rates_sorted_by_rankrate = use_rankrate
         self.request_count = 0
         self.error_count = 0
         self.rate_limit_count = 0
@@ -284,11 +309,15 @@ class BestChangeClientAsync:
         if len(valid_tickers) < len(common_tickers):
             print(f"[BestChange] ⚠️  Пропущено {len(common_tickers) - len(valid_tickers)} неизвестных тикеров")
 
+        # Множество для проверки целевых валют: список проверялся бы перебором
+        # для каждого направления каждой монеты
+        target_tickers = frozenset(valid_tickers)
+
         tasks = []
         for ticker in valid_tickers:
             currency_id = self.crypto_currencies[ticker]
             tasks.append(
-                self._load_rates_for_currency(ticker, currency_id, valid_tickers, use_rankrate)
+                self._load_rates_for_currency(ticker, currency_id, target_tickers, use_rankrate)
             )
 
         semaphore = asyncio.Semaphore(self.max_concurrent_requests)
@@ -326,6 +355,8 @@ class BestChangeClientAsync:
                 from_ticker, pairs = result
                 self.rates[from_ticker] = pairs
 
+        self.data_version += 1
+
         print(f"\n[BestChange] 📈 Статистика загрузки:")
         print(f"  • Всего запросов: {self.request_count}")
         print(f"  • Успешных монет: {successful}/{len(tasks)}")
@@ -337,7 +368,7 @@ class BestChangeClientAsync:
             self,
             from_ticker: str,
             from_id: int,
-            common_tickers: List[str],
+            common_tickers: FrozenSet[str],
             use_rankrate: bool
     ) -> Optional[Tuple[str, Dict[str, List[RateInfo]]]]:
         """
@@ -382,6 +413,7 @@ class BestChangeClientAsync:
                 return None
 
             pairs: Dict[str, List[RateInfo]] = {}
+            changers = self.changers
 
             for i in range(0, len(pair_list), self.batch_size):
                 batch = pair_list[i:i + self.batch_size]
@@ -410,8 +442,11 @@ class BestChangeClientAsync:
                     if not to_code:
                         continue
 
-                    if to_code not in pairs:
-                        pairs[to_code] = []
+                    # Список направления берётся один раз, а не ищется в словаре
+                    # на каждое предложение обменника
+                    offers = pairs.get(to_code)
+                    if offers is None:
+                        offers = pairs[to_code] = []
 
                     for rate_data in rates_list:
                         try:
@@ -423,7 +458,7 @@ class BestChangeClientAsync:
 
                             exchanger_id = rate_data['changer']
 
-                            exchanger_info = self.changers.get(exchanger_id, {})
+                            exchanger_info = changers.get(exchanger_id, {})
                             if not exchanger_info.get('active', False):
                                 continue
 
@@ -442,19 +477,18 @@ class BestChangeClientAsync:
                                 marks=rate_data.get('marks', [])
                             )
 
-                            pairs[to_code].append(rate_info)
+                            offers.append(rate_info)
 
                         except (ValueError, TypeError, KeyError):
                             continue
 
             # КРИТИЧНО: Сортируем по GET курсу (инвертированному) по убыванию
-            # Лучшие курсы (больше получаем) будут сверху
-            for to_code in pairs:
-                pairs[to_code].sort(
-                    key=lambda x: (1.0 / x.rankrate) if use_rankrate and x.rankrate > 0 else (
-                                1.0 / x.rate) if x.rate > 0 else 0,
-                    reverse=True  # От большего к меньшему (лучшие GET курсы сверху)
-                )
+            # Лучшие курсы (больше получаем) будут сверху.
+            # GET = 1 / GIVE, а rate и rankrate выше уже отфильтрованы > 0, поэтому
+            # убывание GET - это возрастание GIVE: сортируем без деления в ключе
+            sort_key = attrgetter('rankrate') if use_rankrate else attrgetter('rate')
+            for offers in pairs.values():
+                offers.sort(key=sort_key)
 
             return (from_ticker, pairs) if pairs else None
 
@@ -494,18 +528,32 @@ class BestChangeClientAsync:
         Returns:
             Лучший RateInfo (отсортирован по GET курсу - по убыванию) или None
         """
-        if from_ticker not in self.rates:
+        directions = self.rates.get(from_ticker)
+        if not directions:
             return None
 
-        if to_ticker not in self.rates[from_ticker]:
-            return None
+        return self.select_best_rate(directions.get(to_ticker), min_reserve)
+
+    @staticmethod
+    def select_best_rate(rates: Optional[List[RateInfo]], min_reserve: float = 0) -> Optional[RateInfo]:
+        """
+        Выбирает лучший курс из уже отсортированного списка предложений направления
+
+        Args:
+            rates: Список RateInfo из self.rates[from][to] (лучший первым)
+            min_reserve: Минимальный резерв обменника
 
-        rates = self.rates[from_ticker][to_ticker]
+        Returns:
+            Лучший RateInfo или None
+        """
+        if not rates:
+            return None
 
         if min_reserve > 0:
-            rates = [r for r in rates if r.reserve >= min_reserve]
+            # Первый подходящий по резерву - лучший, дальше список не просматриваем
+            return next((r for r in rates if r.reserve >= min_reserve), None)
 
-        return rates[0] if rates else None
+        return rates[0]
 
     def get_top_rates(
             self,
@@ -526,16 +574,16 @@ class BestChangeClientAsync:
         Returns:
             Список из топ N RateInfo (отсортированы по GET курсу)
         """
-        if from_ticker not in self.rates:
+        directions = self.rates.get(from_ticker)
+        if not directions:
             return []
 
-        if to_ticker not in self.rates[from_ticker]:
+        rates = directions.get(to_ticker)
+        if not rates:
             return []
 
-        rates = self.rates[from_ticker][to_ticker]
-
         if min_reserve > 0:
-            rates = [r for r in rates if r.reserve >= min_reserve]
+            return list(islice((r for r in rates if r.reserve >= min_reserve), top_n))
 
         return rates[:top_n]
 
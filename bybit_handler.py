@@ -1,19 +1,20 @@
 import aiohttp
 import asyncio
-import json
+import heapq
 import hmac
-import hashlib
 import time
 from typing import Dict, Set, Tuple, Optional, Callable
 from collections import deque
-from datetime import datetime
 from configs_continuous import (
     BYBIT_API_URL, BYBIT_WS_URL, REQUEST_TIMEOUT, ENABLE_COIN_FILTER,
     BLACKLIST_COINS, WHITELIST_COINS, MIN_24H_VOLUME_USDT,
     MIN_LIQUIDITY_SCORE, USE_ONLY_TOP_LIQUID_COINS, WEBSOCKET_ENABLED,
-    WEBSOCKET_RECONNECT_DELAY, WEBSOCKET_PING_INTERVAL,
-    BYBIT_API_KEY, BYBIT_API_SECRET
+    WEBSOCKET_RECONNECT_DELAY, BYBIT_API_KEY, BYBIT_API_SECRET, WITHDRAWAL_FEES_TTL
 )
+from utils import json_loads
+
+# Котируемые валюты Bybit в порядке проверки суффикса символа
+QUOTE_CURRENCIES = ('USDT', 'USDC', 'BTC', 'ETH', 'BNB', 'BUSD', 'DAI', 'TRX', 'XRP', 'SOL', 'DOGE')
 
 
 class BybitClientAsync:
@@ -24,6 +25,9 @@ class BybitClientAsync:
         self.ws_url = BYBIT_WS_URL
         self.api_key = BYBIT_API_KEY
         self.api_secret = BYBIT_API_SECRET
+        self._api_secret_bytes = (BYBIT_API_SECRET or "").encode("utf-8")
+        # Постоянная часть параметров авторизации (собирается один раз)
+        self._auth_params_template = {"api_key": self.api_key}
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (compatible; ArbitrageBot/8.0)',
             'Accept': 'application/json'
@@ -37,18 +41,33 @@ class BybitClientAsync:
         self.usdt_pairs: Dict[str, float] = {}
         self.coins: Set[str] = set()
         self.trading_pairs: Dict[Tuple[str, str], float] = {}
+        # Счётчик версий данных: увеличивается при каждом изменении цен или комиссий,
+        # по нему анализатор понимает, что пересчитывать нечего
+        self.data_version = 0
+        # Версия набора пар, ликвидности и объёмов: меняется только при полной
+        # загрузке пар (обновления цен по WebSocket её не трогают)
+        self.pairs_version = 0
+        # Версия данных на момент последней полной перезагрузки (пары или комиссии
+        # на вывод) и версия последнего изменения цены каждой монеты по WebSocket:
+        # по ним анализатор пересчитывает только пары с изменившимися монетами
+        self.reload_version = 0
+        self.price_changed_at: Dict[str, int] = {}
         self.pair_volumes: Dict[Tuple[str, str], float] = {}
         self.pair_liquidity: Dict[Tuple[str, str], float] = {}
 
         # Комиссии на вывод (кэш)
         self.withdrawal_fees: Dict[str, Dict] = {}  # {coin: {chain: fee}}
         self.min_withdrawal_fees: Dict[str, float] = {}  # {coin: min_fee}
+        self.best_withdrawal_chains: Dict[str, Dict] = {}  # {coin: {'chain', 'fee', 'min', 'chain_full'}}
         self.withdrawal_info_loaded = False
+        self._withdrawal_fees_loaded_at = 0.0  # time.monotonic() последней успешной загрузки
 
         # WebSocket данные
         self.ws_prices: Dict[str, float] = {}
         self.price_updates: deque = deque(maxlen=1000)
-        self.last_update_time: Dict[str, datetime] = {}
+        # Время последнего обновления цены (Unix time, float); в datetime переводится
+        # только при необходимости через datetime.fromtimestamp()
+        self.last_update_time: Dict[str, float] = {}
 
         # Статистика
         self.filtered_by_volume = 0
@@ -69,7 +88,17 @@ class BybitClientAsync:
     async def create_session(self):
         """Создаёт HTTP и WebSocket сессии"""
         if self.session is None:
-            self.session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+            # Один хост Bybit: кэшируем DNS и держим соединения открытыми между циклами
+            connector = aiohttp.TCPConnector(
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                force_close=False  # Переиспользование соединений
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=self.timeout
+            )
 
         if WEBSOCKET_ENABLED and self.ws_session is None:
             self.ws_session = aiohttp.ClientSession()
@@ -96,12 +125,21 @@ class BybitClientAsync:
             return ""
 
         sign_payload = "&".join([f"{k}={v}" for k, v in sorted(params.items())])
-        signature = hmac.new(
-            self.api_secret.encode("utf-8"),
-            sign_payload.encode("utf-8"),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
+        # hmac.digest — быстрый one-shot путь через OpenSSL, ключ закодирован заранее
+        return hmac.digest(self._api_secret_bytes, sign_payload.encode("utf-8"), "sha256").hex()
+
+    def _get_auth_params(self) -> Dict:
+        """Возвращает подписанные параметры авторизации для приватных запросов"""
+        params = self._auth_params_template.copy()
+        params["timestamp"] = str(int(time.time() * 1000))
+        params["sign"] = self._generate_signature(params)
+        return params
+
+    def _withdrawal_fees_expired(self) -> bool:
+        """Проверяет, нужно ли заново загрузить комиссии на вывод"""
+        if not self.withdrawal_info_loaded:
+            return True
+        return time.monotonic() - self._withdrawal_fees_loaded_at >= WITHDRAWAL_FEES_TTL
 
     async def load_withdrawal_fees(self):
         """
@@ -120,15 +158,7 @@ class BybitClientAsync:
             print("[Bybit] 📥 Загрузка комиссий на вывод...")
 
             endpoint = "/v5/asset/coin/query-info"
-            timestamp = str(int(time.time() * 1000))
-
-            params = {
-                "api_key": self.api_key,
-                "timestamp": timestamp
-            }
-
-            # Генерируем подпись
-            params["sign"] = self._generate_signature(params)
+            params = self._get_auth_params()
 
             url = f"{self.base_url}{endpoint}"
 
@@ -141,15 +171,18 @@ class BybitClientAsync:
                     print(f"[Bybit] ⚠️  HTTP {response.status} при загрузке комиссий")
                     return False
 
-                data = await response.json()
+                body = await response.read()
 
-                if data.get('retCode') != 0:
-                    print(f"[Bybit] ⚠️  API ошибка: {data.get('retMsg', 'Unknown error')}")
-                    return False
+            data = json_loads(body)
+
+            if data.get('retCode') != 0:
+                print(f"[Bybit] ⚠️  API ошибка: {data.get('retMsg', 'Unknown error')}")
+                return False
 
             # Обрабатываем данные
             self.withdrawal_fees.clear()
             self.min_withdrawal_fees.clear()
+            self.best_withdrawal_chains.clear()
 
             rows = data.get('result', {}).get('rows', [])
 
@@ -194,7 +227,21 @@ class BybitClientAsync:
                 if min_fee != float('inf'):
                     self.min_withdrawal_fees[coin] = min_fee
 
+                # Самая выгодная сеть считается один раз при загрузке
+                coin_chains = self.withdrawal_fees[coin]
+                if coin_chains:
+                    best_chain, best_info = min(coin_chains.items(), key=lambda x: x[1]['fee'])
+                    self.best_withdrawal_chains[coin] = {
+                        'chain': best_chain,
+                        'fee': best_info['fee'],
+                        'min': best_info['min'],
+                        'chain_full': best_info['chain']
+                    }
+
             self.withdrawal_info_loaded = True
+            self._withdrawal_fees_loaded_at = time.monotonic()
+            self.data_version += 1
+            self.reload_version = self.data_version
 
             print(f"[Bybit] ✅ Загружено комиссий для {len(self.withdrawal_fees)} монет")
             print(f"[Bybit] 💰 Минимальных комиссий: {len(self.min_withdrawal_fees)}")
@@ -250,26 +297,7 @@ class BybitClientAsync:
         Returns:
             {'chain': str, 'fee': float, 'min': float} или None
         """
-        coin = coin.upper()
-        if coin not in self.withdrawal_fees:
-            return None
-
-        chains = self.withdrawal_fees[coin]
-        if not chains:
-            return None
-
-        # Находим сеть с минимальной комиссией
-        best_chain = min(
-            chains.items(),
-            key=lambda x: x[1]['fee']
-        )
-
-        return {
-            'chain': best_chain[0],
-            'fee': best_chain[1]['fee'],
-            'min': best_chain[1]['min'],
-            'chain_full': best_chain[1]['chain']
-        }
+        return self.best_withdrawal_chains.get(coin.upper())
 
     def _should_include_coin(self, coin: str) -> bool:
         """Проверяет, должна ли монета быть включена в анализ"""
@@ -340,7 +368,9 @@ class BybitClientAsync:
 
             async with self.session.get(url, params=params) as response:
                 response.raise_for_status()
-                data = await response.json()
+                body = await response.read()
+
+            data = json_loads(body)
 
             # Очистка данных
             self.usdt_pairs.clear()
@@ -354,13 +384,21 @@ class BybitClientAsync:
             self.filtered_by_liquidity = 0
 
             result_list = data.get('result', {}).get('list', [])
-            quote_currencies = ['USDT', 'USDC', 'BTC', 'ETH', 'BNB', 'BUSD', 'DAI', 'TRX', 'XRP', 'SOL', 'DOGE']
 
             all_pairs = []
 
             for ticker in result_list:
                 symbol = ticker.get('symbol', '').replace('/', '').upper()
 
+                # Определяем base и quote за один проход по котируемым валютам;
+                # символы без известной котируемой валюты пропускаем
+                for quote in QUOTE_CURRENCIES:
+                    if symbol.endswith(quote) and len(symbol) > len(quote):
+                        base = symbol[:-len(quote)]
+                        break
+                else:
+                    continue
+
                 try:
                     price = float(ticker.get('lastPrice', 0))
                     if price <= 0:
@@ -378,18 +416,6 @@ class BybitClientAsync:
                 except (ValueError, TypeError):
                     continue
 
-                # Определяем base и quote
-                base = None
-                quote = None
-                for potential_quote in quote_currencies:
-                    if symbol.endswith(potential_quote) and len(symbol) > len(potential_quote):
-                        quote = potential_quote
-                        base = symbol[:-len(potential_quote)]
-                        break
-
-                if not base or not quote:
-                    continue
-
                 # Применяем фильтр монет
                 if not self._should_include_coin(base) or not self._should_include_coin(quote):
                     filtered_count += 1
@@ -462,7 +488,8 @@ class BybitClientAsync:
                     f"[Bybit] 💧 Отфильтровано по ликвидности (score <{MIN_LIQUIDITY_SCORE}): {self.filtered_by_liquidity}")
 
             # Топ-10 самых ликвидных пар
-            top_liquid = sorted(self.pair_liquidity.items(), key=lambda x: x[1], reverse=True)[:10]
+            # Частичная выборка вместо сортировки всех пар ради десяти
+            top_liquid = heapq.nlargest(10, self.pair_liquidity.items(), key=lambda x: x[1])
             print(f"\n[Bybit] 🏆 Топ-10 самых ликвидных пар:")
             for (base, quote), score in top_liquid:
                 volume = self.pair_volumes.get((base, quote), 0)
@@ -471,9 +498,14 @@ class BybitClientAsync:
 
             # Инициализируем WebSocket данные
             self.ws_prices = self.usdt_pairs.copy()
+            self.data_version += 1
+            self.pairs_version += 1
+            self.reload_version = self.data_version
+            self.price_changed_at.clear()
 
-            # Загружаем комиссии на вывод
-            await self.load_withdrawal_fees()
+            # Загружаем комиссии на вывод (только если устарели - меняются редко)
+            if self._withdrawal_fees_expired():
+                await self.load_withdrawal_fees()
 
         except Exception as e:
             print(f"[Bybit] ❌ Ошибка при загрузке пар: {e}")
@@ -545,7 +577,7 @@ class BybitClientAsync:
     async def _handle_ws_message(self, data: str):
         """Обрабатывает сообщения от WebSocket"""
         try:
-            msg = json.loads(data)
+            msg = json_loads(data)
 
             # Пропускаем служебные сообщения
             if 'op' in msg:
@@ -564,16 +596,21 @@ class BybitClientAsync:
                     if price > 0 and coin in self.usdt_pairs:
                         old_price = self.ws_prices.get(coin, 0)
                         self.ws_prices[coin] = price
-                        self.usdt_pairs[coin] = price
-                        self.last_update_time[coin] = datetime.now()
+                        if price != self.usdt_pairs[coin]:
+                            self.usdt_pairs[coin] = price
+                            self.data_version += 1
+                            self.price_changed_at[coin] = self.data_version
+                        self.last_update_time[coin] = time.time()
                         self.ws_updates_count += 1
 
                         # Логируем каждые 100 обновлений
                         if self.ws_updates_count % 100 == 0:
                             print(f"[Bybit WS] 📊 Обработано обновлений: {self.ws_updates_count}")
 
-                        # Вызываем callback если задан
-                        if self.on_price_update and abs(price - old_price) / old_price > 0.001:
+                        # Вызываем callback если задан (порог 0.1% умножением, без деления;
+                        # old_price > 0 - для монеты без прошлой цены сравнивать не с чем)
+                        if (self.on_price_update and old_price > 0
+                                and abs(price - old_price) > old_price * 0.001):
                             await self.on_price_update(coin, old_price, price)
 
         except Exception as e:
@@ -629,6 +666,18 @@ class BybitClientAsync:
                 quotes.add(b)
         return quotes
 
+    def changed_coins_since(self, version: int) -> Optional[Set[str]]:
+        """
+        Возвращает монеты, цены которых изменились по WebSocket после версии данных version
+
+        Returns:
+            Множество монет или None, если после version была полная перезагрузка
+            (тогда изменилось всё)
+        """
+        if self.reload_version > version:
+            return None
+        return {coin for coin, changed_at in self.price_changed_at.items() if changed_at > version}
+
     def get_liquid_usdt_coins(self) -> list:
         """Возвращает список монет с USDT-парами, отсортированных по ликвидности"""
         coins_with_scores = []
@@ -641,10 +690,10 @@ class BybitClientAsync:
 
     def get_ws_statistics(self) -> Dict:
         """Возвращает статистику WebSocket"""
+        now = time.time()
         return {
             'running': self.ws_running,
             'updates_count': self.ws_updates_count,
             'tracked_pairs': len(self.ws_prices),
-            'last_updates': len([t for t in self.last_update_time.values()
-                                 if (datetime.now() - t).seconds < 60])
+            'last_updates': sum(1 for t in self.last_update_time.values() if now - t < 60)
         }
\ No newline at end of file
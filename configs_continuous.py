@@ -25,6 +25,10 @@ MONITORING_INTERVAL = float(os.getenv("MONITORING_INTERVAL", 20.0))
 # Данные BestChange и Bybit будут перезагружаться автоматически
 DATA_RELOAD_INTERVAL = int(os.getenv("DATA_RELOAD_INTERVAL", 3600))  # 1 час
 
+# Время жизни комиссий на вывод Bybit (секунды)
+# Комиссии меняются редко, поэтому не запрашиваются при каждой перезагрузке пар
+WITHDRAWAL_FEES_TTL = int(os.getenv("WITHDRAWAL_FEES_TTL", 21600))  # 6 часов
+
 # Минимальное время между показом одной и той же связки (секунды)
 MIN_TIME_BETWEEN_DUPLICATE = int(os.getenv("MIN_TIME_BETWEEN_DUPLICATE", 60))
 
@@ -64,6 +68,7 @@ REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", 60))
 ENABLE_CACHE = True
 CACHE_HOT_PAIRS = int(os.getenv("CACHE_HOT_PAIRS", 100))  # Количество "горячих" пар
 CACHE_TTL = int(os.getenv("CACHE_TTL", 300))  # Время жизни кэша (секунды)
+PAIR_STATS_MAX = int(os.getenv("PAIR_STATS_MAX", 5000))  # Максимум пар в статистике (LRU)
 
 # ============================================================================
 # WEBSOCKET (для real-time обновлений цен)
@@ -135,6 +140,7 @@ def print_config_summary():
     print(f"💵 Минимальная прибыль: ${MIN_PROFIT_USD}")
     print(f"⏱️  Интервал проверки: {MONITORING_INTERVAL}с")
     print(f"🔄 Перезагрузка данных: каждые {DATA_RELOAD_INTERVAL//60}мин")
+    print(f"💳 Обновление комиссий на вывод: каждые {WITHDRAWAL_FEES_TTL//60}мин")
     print(f"🚫 Фильтр дубликатов: {MIN_TIME_BETWEEN_DUPLICATE}с")
     print(f"\n💧 ЛИКВИДНОСТЬ:")
     print(f"   • Мин. объем 24ч: ${MIN_24H_VOLUME_USDT:,.0f}")
@@ -6,7 +6,7 @@
 import asyncio
 import signal
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, Dict
 from collections import deque
 import traceback
 
@@ -80,22 +80,22 @@ class ContinuousArbitrageMonitor:
             self.bestchange = BestChangeClientAsync()
             await self.bestchange.create_session()
 
-            # Загружаем данные Bybit
-            print("\n[Init] 📥 Загрузка данных Bybit...")
-            await self.bybit.load_usdt_pairs()
+            # Загружаем данные Bybit и справочники BestChange параллельно - они независимы
+            print("\n[Init] 📥 Загрузка данных Bybit и BestChange...")
+            await asyncio.gather(
+                self.bybit.load_usdt_pairs(),
+                self.bestchange.load_currencies(),
+                self.bestchange.load_exchangers()
+            )
 
             if len(self.bybit.usdt_pairs) == 0:
                 raise Exception("Не удалось загрузить торговые пары Bybit")
 
             print(f"[Init] ✅ Bybit: загружено {len(self.bybit.usdt_pairs)} USDT-пар")
 
-            # Загружаем данные BestChange
-            print("\n[Init] 📥 Загрузка данных BestChange...")
-            await self.bestchange.load_currencies()
-            await self.bestchange.load_exchangers()
-
             # Находим общие монеты
-            common_coins = set(self.bybit.usdt_pairs.keys()) & set(self.bestchange.crypto_currencies.keys())
+            # Пересечение представлений ключей - без копирования обоих словарей в set
+            common_coins = self.bybit.usdt_pairs.keys() & self.bestchange.crypto_currencies.keys()
             print(f"[Init] ✅ Общих монет: {len(common_coins)}")
 
             if len(common_coins) == 0:
@@ -139,7 +139,7 @@ class ContinuousArbitrageMonitor:
 
                 # Перезагружаем BestChange
                 print("[Reload] 📥 Обновление курсов BestChange...")
-                common_coins = set(self.bybit.usdt_pairs.keys()) & set(self.bestchange.crypto_currencies.keys())
+                common_coins = self.bybit.usdt_pairs.keys() & self.bestchange.crypto_currencies.keys()
                 await self.bestchange.load_rates(list(common_coins), use_rankrate=True)
 
                 self.last_data_reload = datetime.now()
@@ -171,47 +171,50 @@ class ContinuousArbitrageMonitor:
     def _print_opportunity_instant(self, opp: Dict, rank: int):
         """Мгновенный вывод найденной возможности"""
         timestamp = datetime.now().strftime('%H:%M:%S')
+        coins = opp['coins']
 
-        print(f"\n{'🎯' * 50}")
-        print(f"⏰ {timestamp} | НАЙДЕНА СВЯЗКА #{self.total_opportunities_found}")
-        print(f"{'─' * 100}")
-        print(f"📍 Путь: {opp['path']}")
+        # Вся карточка собирается в список строк и выводится одной записью в stdout
+        lines = [
+            f"\n{'🎯' * 50}",
+            f"⏰ {timestamp} | НАЙДЕНА СВЯЗКА #{self.total_opportunities_found}",
+            f"{'─' * 100}",
+            f"📍 Путь: {opp['path']}",
+        ]
 
         # Добавляем ссылки на Bybit и обменник
         if 'bybit_url_a' in opp:
-            print(f"🔗 Bybit {opp['coins'][0]}/USDT: {opp['bybit_url_a']}")
+            lines.append(f"🔗 Bybit {coins[0]}/USDT: {opp['bybit_url_a']}")
         if 'bybit_url_b' in opp:
-            print(f"🔗 Bybit {opp['coins'][1]}/USDT: {opp['bybit_url_b']}")
+            lines.append(f"🔗 Bybit {coins[1]}/USDT: {opp['bybit_url_b']}")
         if 'bybit_deposit_url' in opp:
-            print(f"🔗 Депозит Bybit: {opp['bybit_deposit_url']}")
+            lines.append(f"🔗 Депозит Bybit: {opp['bybit_deposit_url']}")
         if 'bybit_withdraw_url' in opp:
-            print(f"🔗 Вывод Bybit: {opp['bybit_withdraw_url']}")
+            lines.append(f"🔗 Вывод Bybit: {opp['bybit_withdraw_url']}")
         if 'exchanger_url' in opp:
-            print(f"🔗 Обменник: {opp['exchanger_url']}")
+            lines.append(f"🔗 Обменник: {opp['exchanger_url']}")
 
-        print(f"💰 Спред: {opp['spread']:.4f}% | Прибыль: ${opp['profit']:.4f}")
+        lines.append(f"💰 Спред: {opp['spread']:.4f}% | Прибыль: ${opp['profit']:.4f}")
 
         # Показываем комиссии Bybit
         if 'bybit_total_fee' in opp:
-            print(f"💳 Комиссии Bybit: ${opp['bybit_total_fee']:.4f} (покупка: ${opp['bybit_fee_buy']:.4f}, продажа: ${opp['bybit_fee_sell']:.4f})")
-        print(f"💵 ${opp['initial']:.2f} → ${opp['final']:.2f}")
-        print(f"🏦 Обменник: {opp['exchanger']} (резерв: ${opp['reserve']:,.0f})")
+            lines.append(f"💳 Комиссии Bybit: ${opp['bybit_total_fee']:.4f} (покупка: ${opp['bybit_fee_buy']:.4f}, продажа: ${opp['bybit_fee_sell']:.4f})")
+        lines.append(f"💵 ${opp['initial']:.2f} → ${opp['final']:.2f}")
+        lines.append(f"🏦 Обменник: {opp['exchanger']} (резерв: ${opp['reserve']:,.0f})")
 
-        coins = opp['coins']
         if len(coins) >= 2:
             liq_a = opp.get('liquidity_a', 0)
             liq_b = opp.get('liquidity_b', 0)
-            print(f"💧 Ликвидность: {coins[0]} ({liq_a:.1f}) → {coins[1]} ({liq_b:.1f})")
+            lines.append(f"💧 Ликвидность: {coins[0]} ({liq_a:.1f}) → {coins[1]} ({liq_b:.1f})")
 
         # Показываем курс обмена
         if 'exchange_rate' in opp:
-            print(f"📊 Курс: 1 {coins[0]} = {opp['exchange_rate']:.8f} {coins[1]}")
+            lines.append(f"📊 Курс: 1 {coins[0]} = {opp['exchange_rate']:.8f} {coins[1]}")
 
-        print(f"\n📋 ДЕТАЛИ ОПЕРАЦИЙ:")
-        for step in opp['steps']:
-            print(f"   {step}")
+        lines.append(f"\n📋 ДЕТАЛИ ОПЕРАЦИЙ:")
+        lines.extend(f"   {step}" for step in opp['steps'])
+        lines.append(f"{'🎯' * 50}\n")
 
-        print(f"{'🎯' * 50}\n")
+        print("\n".join(lines))
 
         # Логируем в файл
         self.logger.log_opportunity(opp)
@@ -256,6 +259,9 @@ class ContinuousArbitrageMonitor:
                 # Добавляем в историю
                 self.recent_opportunities.append((opp, datetime.now()))
 
+                # Текстовые шаги собираем только для новых связок
+                self.analyzer.materialize_steps(opp)
+
                 # Выводим сразу
                 self.total_opportunities_found += 1
                 new_opportunities += 1
@@ -305,9 +311,9 @@ class ContinuousArbitrageMonitor:
             self.total_iterations += 1
 
             try:
-                print(f"\n{'─' * 100}")
-                print(f"🔄 ИТЕРАЦИЯ #{self.total_iterations} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"{'─' * 100}")
+                print(f"\n{'─' * 100}\n"
+                      f"🔄 ИТЕРАЦИЯ #{self.total_iterations} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                      f"{'─' * 100}")
 
                 # Выполняем поиск
                 await self.run_single_iteration()
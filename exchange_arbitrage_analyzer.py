@@ -1,10 +1,11 @@
 import asyncio
-import math
+import heapq
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
-from configs_continuous import ENABLE_CACHE, CACHE_HOT_PAIRS, MIN_PROFIT_USD
-from utils import is_valid_number, validate_price, validate_rate, TTLCache, MemoizedCalculator
+from datetime import datetime
+from collections import OrderedDict
+from configs_continuous import ENABLE_CACHE, CACHE_HOT_PAIRS, MIN_PROFIT_USD, PAIR_STATS_MAX, LOG_LEVEL
+from bestchange_handler import RateInfo
+from utils import is_valid_number, validate_price, validate_rate, TTLCache
 
 
 class ExchangeArbitrageAnalyzer:
@@ -21,21 +22,116 @@ class ExchangeArbitrageAnalyzer:
     BYBIT_TAKER_FEE = 0.001800  # 0.1800%
     BYBIT_MAKER_FEE = 0.001000  # 0.1000%
 
+    # Постоянные части результата (одинаковы для всех связок)
+    SCHEME = "Bybit → BestChange → Bybit"
+    BYBIT_DEPOSIT_URL = "https://www.bybit.com/user/assets/deposit?source=AssetDeposit"
+    BYBIT_WITHDRAW_URL = "https://www.bybit.com/user/assets/home/overview"
+
+    # Оценка комиссий на вывод на основе типичных значений (если API ключи не заданы)
+    ESTIMATED_WITHDRAWAL_FEES = {
+        'BTC': 0.0005,
+        'ETH': 0.005,
+        'USDT': 1.0,
+        'USDC': 1.0,
+        'BNB': 0.0001,
+        'SOL': 0.01,
+        'XRP': 0.25,
+        'DOGE': 5.0,
+        'TRX': 1.0
+    }
+
     def __init__(self, bybit_client, bestchange_client):
         self.bybit = bybit_client
         self.bestchange = bestchange_client
         self.found_count = 0
         self.checked_pairs = 0
+        # Пары, отсеянные быстрой оценкой (за всё время): отдельной статистики
+        # по ним не ведём, иначе каждое сканирование вытесняло бы из LRU всю
+        # статистику пар, дошедших до полной проверки
+        self.prefiltered_pairs = 0
+        # Время текущего сканирования (одно на все найденные связки)
+        self._scan_timestamp = datetime.now().isoformat()
+        # Ликвидность и объём ликвидных монет: coin -> (liquidity, volume)
+        self._coin_stats: Dict[str, tuple] = {}
+        # Общие и ликвидные монеты зависят только от набора пар Bybit и списка валют
+        # BestChange - пересчитываются, лишь когда меняется одна из их версий
+        self._coins_key = None
+        self._common_coins_count = 0
+        self._liquid_coins: List[str] = []
+
+        # Результат последнего сканирования, его параметры с версией курсов BestChange
+        # и версия данных Bybit, на которых он получен
+        self._last_scan_key = None
+        self._last_bybit_version = None
+        self._last_scan_results: List[Dict] = []
 
         # Кэширование "горячих" пар с TTL и ограничением размера
         self.hot_pairs_cache = TTLCache(max_size=CACHE_HOT_PAIRS, ttl_seconds=600)  # 10 минут TTL
-        self.pair_performance = defaultdict(lambda: {'checks': 0, 'finds': 0, 'avg_spread': 0})
-        
-        # Мемоизация для частых расчетов
-        self.calculator = MemoizedCalculator(cache_size=500, ttl_seconds=60)
+        # Статистика по парам, дошедшим до полной проверки, с ограничением
+        # размера (LRU, не меньше числа таких пар в одном сканировании)
+        self.pair_performance: OrderedDict = OrderedDict()
+        self._pair_performance_max = PAIR_STATS_MAX
         
         # Кэш для результатов проверки пар (избегаем повторных проверок)
         self.pair_check_cache = TTLCache(max_size=1000, ttl_seconds=30)  # 30 секунд TTL
+        # Версии загрузок Bybit (пары, комиссии на вывод) и BestChange, на которых
+        # получены записи кэша проверок
+        self._pair_check_cache_key = None
+
+    def _get_pair_stats(self, pair: tuple) -> Dict:
+        """Возвращает статистику пары, вытесняя самые давно используемые при переполнении"""
+        stats = self.pair_performance.get(pair)
+        if stats is None:
+            stats = {'checks': 0, 'finds': 0, 'avg_spread': 0}
+            self.pair_performance[pair] = stats
+            if len(self.pair_performance) > self._pair_performance_max:
+                self.pair_performance.popitem(last=False)
+        else:
+            self.pair_performance.move_to_end(pair)
+        return stats
+
+    def _refresh_liquid_coins(self) -> None:
+        """
+        Пересчитывает общие монеты Bybit/BestChange и отбирает ликвидные
+
+        Набор пар, ликвидность и объёмы Bybit меняются только при полной загрузке
+        пар, а список валют BestChange - только при загрузке валют, поэтому между
+        перезагрузками результат берётся из прошлого вызова
+        """
+        coins_key = (self.bybit.pairs_version, self.bestchange.currencies_version)
+        if coins_key == self._coins_key:
+            return
+
+        # Пересечение представлений ключей: без копирования обоих словарей в set,
+        # обход идёт по меньшему из них
+        common_coins = self.bybit.usdt_pairs.keys() & self.bestchange.crypto_currencies.keys()
+
+        # Ликвидность и объём считаются один раз и потом переиспользуются
+        # при сборке результатов (_get_coin_stats)
+        coin_stats = {}
+        # Методы привязаны к локальным именам: цикл идёт по всем общим монетам
+        get_liquidity_score = self.bybit.get_liquidity_score
+        get_volume_24h = self.bybit.get_volume_24h
+        for coin in common_coins:
+            liquidity = get_liquidity_score(coin, 'USDT')
+            # Ранний выход - пропускаем неликвидные монеты
+            if liquidity < 30:
+                continue
+            
+            coin_stats[coin] = (liquidity, get_volume_24h(coin, 'USDT'))
+
+        self._coin_stats = coin_stats
+        self._common_coins_count = len(common_coins)
+        # Оптимизированная сортировка - только по ликвидности
+        self._liquid_coins = sorted(coin_stats, key=lambda coin: coin_stats[coin][0], reverse=True)
+        self._coins_key = coins_key
+
+    def _get_coin_stats(self, coin: str) -> tuple:
+        """Ликвидность и объём монеты к USDT: из данных сканирования или у клиента Bybit"""
+        stats = self._coin_stats.get(coin)
+        if stats is None:
+            stats = (self.bybit.get_liquidity_score(coin, 'USDT'), self.bybit.get_volume_24h(coin, 'USDT'))
+        return stats
 
     def _get_bybit_trade_url(self, coin: str, quote: str = 'USDT') -> str:
         """Генерирует ссылку на торговую пару Bybit"""
@@ -43,11 +139,11 @@ class ExchangeArbitrageAnalyzer:
 
     def _get_bybit_deposit_url(self) -> str:
         """Генерирует ссылку на страницу депозита Bybit"""
-        return "https://www.bybit.com/user/assets/deposit?source=AssetDeposit"
+        return self.BYBIT_DEPOSIT_URL
 
     def _get_bybit_withdraw_url(self) -> str:
         """Генерирует ссылку на страницу вывода Bybit"""
-        return "https://www.bybit.com/user/assets/home/overview"
+        return self.BYBIT_WITHDRAW_URL
 
     def _get_bestchange_exchanger_url(self, exchanger_id: int) -> str:
         """Генерирует ссылку на обменник BestChange"""
@@ -55,7 +151,7 @@ class ExchangeArbitrageAnalyzer:
 
     def _calculate_bybit_fees(self, amount: float, is_taker: bool = True) -> tuple:
         """
-        Рассчитывает комиссии Bybit с мемоизацией
+        Рассчитывает комиссии Bybit
 
         Args:
             amount: Сумма сделки
@@ -69,7 +165,8 @@ class ExchangeArbitrageAnalyzer:
             return (0.0, 0.0)
         
         fee_rate = self.BYBIT_TAKER_FEE if is_taker else self.BYBIT_MAKER_FEE
-        return self.calculator.calculate_fee(amount, fee_rate)
+        fee_amount = amount * fee_rate
+        return (fee_amount, amount - fee_amount)
 
     def _get_withdrawal_fee_in_usdt(self, coin: str, amount: float, price_usdt: float) -> tuple:
         """
@@ -88,19 +185,7 @@ class ExchangeArbitrageAnalyzer:
 
         if withdrawal_fee_coin is None:
             # Если данные о комиссии недоступны, используем приблизительную оценку
-            # На основе типичных комиссий
-            estimated_fees = {
-                'BTC': 0.0005,
-                'ETH': 0.005,
-                'USDT': 1.0,
-                'USDC': 1.0,
-                'BNB': 0.0001,
-                'SOL': 0.01,
-                'XRP': 0.25,
-                'DOGE': 5.0,
-                'TRX': 1.0
-            }
-            withdrawal_fee_coin = estimated_fees.get(coin, 0.01)  # По умолчанию 0.01 монеты
+            withdrawal_fee_coin = self.ESTIMATED_WITHDRAWAL_FEES.get(coin, 0.01)  # По умолчанию 0.01 монеты
             best_chain = "неизвестна (оценка)"
         else:
             # Получаем информацию о лучшей сети
@@ -132,59 +217,71 @@ class ExchangeArbitrageAnalyzer:
             min_spread: Минимальный спред для фильтрации
             max_spread: Максимальный спред (защита от аномалий)
             min_reserve: Минимальный резерв обменника
-            parallel_requests: Количество параллельных проверок
+            parallel_requests: Размер батча проверок (не больше 100), после которого
+                управление отдаётся циклу событий
         """
-        print(f"\n[BestChange Arbitrage] 🚀 БЫСТРЫЙ ПОИСК связок...")
-        print(f"[BestChange Arbitrage] Параметры: ${start_amount}, спред {min_spread}%-{max_spread}%")
-        print(f"[BestChange Arbitrage] ⚡ Параллельных запросов: {parallel_requests}")
-        print(f"[BestChange Arbitrage] 💰 Мин. резерв: ${min_reserve}, мин. прибыль: ${MIN_PROFIT_USD}")
-        print(
-            f"[BestChange Arbitrage] 💳 Комиссии Bybit: Taker {self.BYBIT_TAKER_FEE * 100:.4f}%, Maker {self.BYBIT_MAKER_FEE * 100:.4f}%")
-
         if self.bybit.withdrawal_info_loaded:
-            print(
-                f"[BestChange Arbitrage] ✅ Учитываются комиссии на вывод (загружено для {len(self.bybit.min_withdrawal_fees)} монет)")
+            withdrawal_line = (f"[BestChange Arbitrage] ✅ Учитываются комиссии на вывод "
+                               f"(загружено для {len(self.bybit.min_withdrawal_fees)} монет)")
         else:
-            print(f"[BestChange Arbitrage] ⚠️  Комиссии на вывод будут оценочными (добавьте API ключи для точности)")
+            withdrawal_line = f"[BestChange Arbitrage] ⚠️  Комиссии на вывод будут оценочными (добавьте API ключи для точности)"
+
+        # Заголовок сканирования - одной записью в stdout
+        print("\n".join((
+            f"\n[BestChange Arbitrage] 🚀 БЫСТРЫЙ ПОИСК связок...",
+            f"[BestChange Arbitrage] Параметры: ${start_amount}, спред {min_spread}%-{max_spread}%",
+            f"[BestChange Arbitrage] ⚡ Проверок за батч: {min(parallel_requests, 100)}",
+            f"[BestChange Arbitrage] 💰 Мин. резерв: ${min_reserve}, мин. прибыль: ${MIN_PROFIT_USD}",
+            f"[BestChange Arbitrage] 💳 Комиссии Bybit: Taker {self.BYBIT_TAKER_FEE * 100:.4f}%, Maker {self.BYBIT_MAKER_FEE * 100:.4f}%",
+            withdrawal_line
+        )))
+
+        # Если ни цены Bybit, ни курсы BestChange не менялись с прошлого сканирования
+        # с теми же параметрами - результат тот же, повторно ничего не считаем
+        scan_key = (self.bestchange.data_version, start_amount, min_spread, max_spread, min_reserve)
+        bybit_version = self.bybit.data_version
+        # Монеты с изменившейся ценой (None - пересчитываются все пары)
+        dirty_coins = None
+        if scan_key == self._last_scan_key:
+            if bybit_version == self._last_bybit_version:
+                self._scan_timestamp = datetime.now().isoformat()
+                print(f"[BestChange Arbitrage] 💤 Данные не изменились - повтор результата прошлого сканирования "
+                      f"({len(self._last_scan_results)} связок)")
+                return [{**opp, 'timestamp': self._scan_timestamp} for opp in self._last_scan_results]
+            # Изменились только цены отдельных монет по WebSocket - достаточно пересчитать их пары
+            dirty_coins = self.bybit.changed_coins_since(self._last_bybit_version)
+
+        # Ключ кэша проверок не включает комиссии на вывод, ликвидность и данные
+        # обменников - при перезагрузке данных Bybit или BestChange кэш сбрасывается
+        data_key = (self.bybit.reload_version, self.bestchange.data_version)
+        if data_key != self._pair_check_cache_key:
+            self.pair_check_cache.clear()
+            self._pair_check_cache_key = data_key
 
         opportunities = []
 
-        # Находим общие монеты
-        bybit_coins = set(self.bybit.usdt_pairs.keys())
-        bestchange_coins = set(self.bestchange.crypto_currencies.keys())
-        common_coins = bybit_coins & bestchange_coins
+        # Общие и ликвидные монеты (пересчёт только при смене набора пар или валют)
+        self._refresh_liquid_coins()
 
-        if not common_coins:
+        if not self._common_coins_count:
             print(f"[BestChange Arbitrage] ❌ Нет общих монет между Bybit и BestChange")
             return opportunities
 
-        # Фильтруем только самые ликвидные монеты (оптимизировано)
-        liquid_coins = []
-        for coin in common_coins:
-            liquidity = self.bybit.get_liquidity_score(coin, 'USDT')
-            # Ранний выход - пропускаем неликвидные монеты
-            if liquidity < 30:
-                continue
-            
-            volume = self.bybit.get_volume_24h(coin, 'USDT')
-            liquid_coins.append((coin, liquidity, volume))
+        common_coins_list = self._liquid_coins
 
-        # Оптимизированная сортировка - только по ликвидности
-        liquid_coins.sort(key=lambda x: x[1], reverse=True)
-        common_coins_list = [coin for coin, _, _ in liquid_coins]
+        print(f"[BestChange Arbitrage] ✓ Общих монет: {self._common_coins_count}\n"
+              f"[BestChange Arbitrage] ✓ Высоколиквидных: {len(common_coins_list)}")
 
-        print(f"[BestChange Arbitrage] ✓ Общих монет: {len(common_coins)}")
-        print(f"[BestChange Arbitrage] ✓ Высоколиквидных: {len(common_coins_list)}")
-
-        # Создаём все возможные пары
-        all_pairs = []
+        # Создаём все возможные пары сразу вместе со списками предложений BestChange,
+        # чтобы отсев не искал их в словаре курсов повторно
+        rates = self.bestchange.rates
+        all_pairs = []  # [((coin_a, coin_b), offers)]
         all_pairs_set = set()  # Для быстрой проверки наличия
 
         # Сначала проверяем кэшированные "горячие" пары
         if ENABLE_CACHE:
             # Очищаем истекшие записи
             self.hot_pairs_cache.cleanup_expired()
-            self.calculator.cleanup()
             
             # Получаем актуальные горячие пары
             hot_pairs = self.get_hot_pairs()
@@ -193,55 +290,92 @@ class ExchangeArbitrageAnalyzer:
                 print(f"[BestChange Arbitrage] 🔥 Приоритет для {len(hot_pairs)} горячих пар")
                 for pair in hot_pairs:
                     if pair not in all_pairs_set:
-                        all_pairs.append(pair)
+                        directions = rates.get(pair[0])
+                        all_pairs.append((pair, directions.get(pair[1]) if directions else None))
                         all_pairs_set.add(pair)
 
-        # Добавляем остальные пары (оптимизировано - используем set для быстрой проверки)
+        # Добавляем остальные пары: идём по направлениям, для которых BestChange
+        # реально отдал курсы, а не по всем N² сочетаниям монет
+        liquid_coins_set = set(common_coins_list)
+        add_pair = all_pairs.append
+        mark_pair = all_pairs_set.add
         for coin_a in common_coins_list:
-            for coin_b in common_coins_list:
-                if coin_a != coin_b:
-                    pair = (coin_a, coin_b)
-                    if pair not in all_pairs_set:
-                        all_pairs.append(pair)
-                        all_pairs_set.add(pair)
+            directions = rates.get(coin_a)
+            if not directions:
+                continue
+            for coin_b, offers in directions.items():
+                if coin_b == coin_a or coin_b not in liquid_coins_set:
+                    continue
+                pair = (coin_a, coin_b)
+                if pair not in all_pairs_set:
+                    add_pair((pair, offers))
+                    mark_pair(pair)
+
+        # Пары без изменившихся монет дают тот же результат, что и в прошлый раз:
+        # берём найденные тогда связки и проверяем только пары с новыми ценами
+        kept_opportunities = []
+        if dirty_coins is not None:
+            kept_opportunities = [
+                opp for opp in self._last_scan_results
+                if (opp['coins'][0], opp['coins'][1]) in all_pairs_set
+                and opp['coins'][0] not in dirty_coins and opp['coins'][1] not in dirty_coins
+            ]
+            all_pairs = [
+                (pair, offers) for pair, offers in all_pairs
+                if pair[0] in dirty_coins or pair[1] in dirty_coins
+            ]
+            print(f"[BestChange Arbitrage] ♻️  Изменились цены {len(dirty_coins)} монет - "
+                  f"пересчёт только их пар (сохранено связок: {len(kept_opportunities)})")
 
         total_pairs = len(all_pairs)
-        print(f"[BestChange Arbitrage] 📦 Всего пар для проверки: {total_pairs}")
-        print(f"[BestChange Arbitrage] 💡 Результаты выводятся в реальном времени...")
-        print("=" * 100)
 
-        self.checked_pairs = 0
+        # Быстрый отсев одной арифметикой: полная проверка только для прошедших пар
+        candidate_pairs = self._prefilter_pairs(all_pairs, start_amount, min_spread, min_reserve)
+        self.prefiltered_pairs += total_pairs - len(candidate_pairs)
+        # Лимит статистики не меньше числа проверяемых пар, чтобы одно
+        # сканирование не вытесняло статистику собственных пар
+        self._pair_performance_max = max(PAIR_STATS_MAX, len(candidate_pairs))
+
+        print("\n".join((
+            f"[BestChange Arbitrage] 📦 Всего пар для проверки: {total_pairs}",
+            f"[BestChange Arbitrage] ⚡ Прошли быстрый отсев: {len(candidate_pairs)}",
+            f"[BestChange Arbitrage] 💡 Результаты выводятся в реальном времени...",
+            "=" * 100
+        )))
+
+        # Отсеянные пары тоже считаются проверенными
+        self.checked_pairs = total_pairs - len(candidate_pairs)
         self.found_count = 0
+        self._scan_timestamp = datetime.now().isoformat()
 
-        # Массово-параллельная обработка (оптимизировано)
-        # Используем батчинг для лучшей производительности
-        semaphore = asyncio.Semaphore(parallel_requests)
-        tasks = []
+        # Проверка пары - чистые вычисления без ожиданий, поэтому она выполняется
+        # обычным вызовом, без корутин, семафора и gather. Между батчами управление
+        # отдаётся циклу событий, чтобы не задерживать WebSocket и Telegram
+        batch_size = min(parallel_requests, 100)  # Обрабатываем по 100 пар за раз
+        check_pair = self._check_pair
 
-        for coin_a, coin_b in all_pairs:
-            task = self._check_pair_with_semaphore(
-                semaphore, coin_a, coin_b, start_amount, min_spread, max_spread, min_reserve
-            )
-            tasks.append(task)
-
-        # Оптимизировано: запускаем задачи батчами для лучшего контроля
-        batch_size = min(parallel_requests, 100)  # Обрабатываем по 100 задач за раз
-        results = []
-        
-        for i in range(0, len(tasks), batch_size):
-            batch = tasks[i:i + batch_size]
-            batch_results = await asyncio.gather(*batch, return_exceptions=True)
-            results.extend(batch_results)
+        scan_complete = True
+        try:
+            for i in range(0, len(candidate_pairs), batch_size):
+                for coin_a, coin_b, best_rate in candidate_pairs[i:i + batch_size]:
+                    result = check_pair(coin_a, coin_b, best_rate, start_amount, min_spread, max_spread)
+                    if result is not None:
+                        opportunities.append(result)
+                await asyncio.sleep(0)
+        except Exception as e:
+            # Ошибка в проверке - это баг, а не отсутствие связки: сообщаем о ней
+            # и возвращаем найденное до неё
+            print(f"[BestChange Arbitrage] ❌ Ошибка при проверке пары {coin_a} → {coin_b}: {e}")
+            scan_complete = False
 
-        # Собираем результаты
-        for result in results:
-            if isinstance(result, dict) and 'spread' in result:
-                opportunities.append(result)
+        opportunities.extend({**opp, 'timestamp': self._scan_timestamp} for opp in kept_opportunities)
 
-        print("=" * 100)
-        print(f"\n[BestChange Arbitrage] ✅ Проверка завершена!")
-        print(f"[BestChange Arbitrage] 📊 Проверено пар: {self.checked_pairs}")
-        print(f"[BestChange Arbitrage] 🎯 Найдено связок: {len(opportunities)}")
+        print("\n".join((
+            "=" * 100,
+            f"\n[BestChange Arbitrage] ✅ Проверка завершена!",
+            f"[BestChange Arbitrage] 📊 Проверено пар: {self.checked_pairs}",
+            f"[BestChange Arbitrage] 🎯 Найдено связок: {len(opportunities)}"
+        )))
 
         # Обновляем кэш горячих пар
         if ENABLE_CACHE and opportunities:
@@ -250,297 +384,471 @@ class ExchangeArbitrageAnalyzer:
         # Сортируем по прибыли
         opportunities.sort(key=lambda x: x['profit'], reverse=True)
 
+        # Неполный результат не запоминаем - следующее сканирование будет полным
+        if scan_complete:
+            self._last_scan_key = scan_key
+            self._last_bybit_version = bybit_version
+            self._last_scan_results = list(opportunities)
+        else:
+            self._last_scan_key = None
+
         return opportunities
 
-    async def _check_pair_with_semaphore(
+    def _prefilter_pairs(
+            self,
+            pairs: List[tuple],
+            start_amount: float,
+            min_spread: float,
+            min_reserve: float
+    ) -> List[tuple]:
+        """
+        Быстрый отсев пар по оценке прибыли
+
+        Сумма coin_a, доходящая до обменника (после taker-комиссии и комиссии
+        на вывод), считается один раз на монету: если комиссия на вывод съедает
+        всю сумму, все пары с этой монетой отбрасываются сразу. Для остальных
+        итог оценивается одной арифметикой с небольшим запасом на округление,
+        и пара, не проходящая фильтр, отбрасывается без полной проверки
+        (валидаций, поиска курса и сборки результата). Если предложения
+        отсортированы по rankrate, сначала оценка делается по первому из них
+        (верхняя граница), и только если она проходит, ищется лучший курс
+        с нужным резервом
+
+        Args:
+            pairs: Список ((coin_a, coin_b), предложения BestChange или None)
+
+        Returns:
+            Список (coin_a, coin_b, лучший курс) для полной проверки: курс, выбранный
+            при отсеве, передаётся дальше и повторно не ищется
+        """
+        if not is_valid_number(start_amount):
+            return []
+
+        usdt_pairs = self.bybit.usdt_pairs
+        select_best_rate = self.bestchange.select_best_rate
+        # Первое предложение даёт верхнюю оценку только при сортировке по rankrate
+        bound_by_top_offer = self.bestchange.rates_sorted_by_rankrate
+        # Taker-комиссия продажи B и запас на округление (оценка не должна отсечь
+        # пару, которую полная проверка приняла бы) - в одном множителе
+        sell_factor = (1.0 - self.BYBIT_TAKER_FEE) * (1.0 + 1e-9)
+        # Итог должен пройти и по мин. прибыли, и по мин. спреду - берём больший порог
+        min_final = max(start_amount + MIN_PROFIT_USD, start_amount * (1 + min_spread / 100))
+
+        # coin_a -> сумма, отправляемая на обменник (0 - монету вывести нельзя)
+        sendable = {}
+
+        candidates = []
+        add_candidate = candidates.append
+        for pair, offers in pairs:
+            coin_a, coin_b = pair
+            price_a = usdt_pairs.get(coin_a)
+            price_b = usdt_pairs.get(coin_b)
+            best_rate = None
+
+            if price_a and price_b:
+                amount_a = sendable.get(coin_a)
+                if amount_a is None:
+                    amount_a = sendable[coin_a] = self._sendable_amount(coin_a, start_amount, price_a)
+                if amount_a > 0 and offers:
+                    # Верхняя оценка по лучшему курсу направления без учёта резерва:
+                    # если не проходит даже она, курс с нужным резервом не ищем
+                    top_rankrate = offers[0].rankrate if bound_by_top_offer else 0
+                    if top_rankrate <= 0 or amount_a * price_b * sell_factor >= min_final * top_rankrate:
+                        best_rate = select_best_rate(offers, min_reserve)
+
+            if best_rate and best_rate.rankrate > 0:
+                # A → B по курсу GET (1 / rankrate) → USDT (taker):
+                # amount_a * price_b * (1 - fee) / rankrate >= min_final, без делений
+                if amount_a * price_b * sell_factor >= min_final * best_rate.rankrate:
+                    add_candidate((coin_a, coin_b, best_rate))
+
+        return candidates
+
+    def _sendable_amount(self, coin: str, start_amount: float, price_usdt: float) -> float:
+        """
+        Сумма монеты, которая дойдёт до обменника: покупка на start_amount USDT
+        (taker) минус комиссия на вывод. Считается так же, как в _check_single_pair
+
+        Returns:
+            Количество монет или 0, если покупка невалидна или комиссия съедает сумму
+        """
+        if not validate_price(price_usdt):
+            return 0.0
+
+        _, amount = self._calculate_bybit_fees(start_amount / price_usdt, is_taker=True)
+        if not is_valid_number(amount):
+            return 0.0
+
+        withdraw_fee_coin, _, _ = self._get_withdrawal_fee_in_usdt(coin, amount, price_usdt)
+        amount_after_withdraw = amount - withdraw_fee_coin
+        return amount_after_withdraw if amount_after_withdraw > 0 else 0.0
+
+    def _check_pair(
             self,
-            semaphore: asyncio.Semaphore,
             coin_a: str,
             coin_b: str,
+            best_rate: RateInfo,
             start_amount: float,
             min_spread: float,
-            max_spread: float,
-            min_reserve: float
+            max_spread: float
     ):
-        """Проверяет одну пару с ограничением параллелизма"""
-        async with semaphore:
-            self.checked_pairs += 1
+        """Проверяет одну пару и обновляет её статистику"""
+        self.checked_pairs += 1
 
-            # Прогресс каждые 200 пар
-            if self.checked_pairs % 200 == 0:
-                print(f"[BestChange Arbitrage] 📊 Прогресс: {self.checked_pairs} | Найдено: {self.found_count}")
+        # Прогресс каждые 200 пар (только на максимальном уровне логов)
+        if LOG_LEVEL >= 2 and self.checked_pairs % 200 == 0:
+            print(f"[BestChange Arbitrage] 📊 Прогресс: {self.checked_pairs} | Найдено: {self.found_count}")
 
-            result = await self._check_single_pair(coin_a, coin_b, start_amount, min_spread, max_spread, min_reserve)
+        # Все входные данные проверяются в _check_single_pair явно, непредвиденные
+        # ошибки обрабатываются один раз на сканирование в find_opportunities
+        result = self._check_single_pair(coin_a, coin_b, best_rate, start_amount, min_spread, max_spread)
 
-            if result:
-                self.found_count += 1
+        pair_stats = self._get_pair_stats((coin_a, coin_b))
+
+        if result:
+            self.found_count += 1
+            # Подробный вывод каждой находки только на максимальном уровне логов
+            # (монитор и так выводит каждую новую связку)
+            if LOG_LEVEL >= 2:
                 self._print_opportunity(result, self.found_count)
 
-                # Обновляем статистику пары
-                pair_key = (coin_a, coin_b)
-                self.pair_performance[pair_key]['finds'] += 1
-                self.pair_performance[pair_key]['avg_spread'] = (
-                                                                        self.pair_performance[pair_key]['avg_spread'] +
-                                                                        result['spread']
-                                                                ) / 2
+            # Обновляем статистику пары
+            pair_stats['finds'] += 1
+            pair_stats['avg_spread'] = (pair_stats['avg_spread'] + result['spread']) / 2
 
-            # Обновляем счётчик проверок
-            pair_key = (coin_a, coin_b)
-            self.pair_performance[pair_key]['checks'] += 1
+        # Обновляем счётчик проверок
+        pair_stats['checks'] += 1
 
-            return result
+        return result
 
-    async def _check_single_pair(
+    def _check_single_pair(
             self,
             coin_a: str,
             coin_b: str,
+            best_rate: RateInfo,
             start_amount: float,
             min_spread: float,
-            max_spread: float,
-            min_reserve: float
+            max_spread: float
     ) -> Optional[Dict]:
         """
         Проверяет одну пару монет с учетом ВСЕХ комиссий Bybit
         Схема: USDT → CoinA (Bybit + trade fee) → CoinB (BestChange) → USDT (Bybit + trade fee)
 
+        best_rate - лучший курс BestChange с учётом мин. резерва, уже выбранный
+        при быстром отсеве (_prefilter_pairs)
+
         НОВОЕ: Учитываются комиссии на вывод (withdrawal fees)
         ОПТИМИЗИРОВАНО: Добавлена валидация данных, кэширование, ранний выход
         """
-        # Проверяем кэш результатов (избегаем повторных проверок)
-        cache_key = f"{coin_a}_{coin_b}_{start_amount:.2f}_{min_reserve:.2f}"
+        # Валидация входных параметров
+        if not is_valid_number(start_amount) or start_amount <= 0:
+            return None
+        
+        # Получаем цены на Bybit с валидацией
+        # (без имён для сообщений - иначе f-строки собирались бы на каждой проверке)
+        usdt_pairs = self.bybit.usdt_pairs
+        price_a_usdt = usdt_pairs.get(coin_a)
+        price_b_usdt = usdt_pairs.get(coin_b)
+
+        if not validate_price(price_a_usdt):
+            return None
+        if not validate_price(price_b_usdt):
+            return None
+
+        # Курс от BestChange (выбран при отсеве)
+        if not best_rate:
+            return None
+
+        # Проверяем кэш результатов: ключ из цен и курса (точные значения, без
+        # округления), поэтому при любом изменении цены или курса связка будет
+        # пересчитана; после перезагрузки комиссий или курсов кэш сбрасывается
+        # в find_opportunities
+        cache_key = (
+            coin_a, coin_b, start_amount, min_spread, max_spread,
+            price_a_usdt, price_b_usdt, best_rate.rankrate, best_rate.exchanger_id,
+            best_rate.reserve, best_rate.give_min, best_rate.give_max
+        )
         cached_result = self.pair_check_cache.get(cache_key)
         if cached_result is not None:
-            return cached_result
-        
-        try:
-            # Валидация входных параметров
-            if not is_valid_number(start_amount) or start_amount <= 0:
-                return None
-            
-            # Получаем цены на Bybit с валидацией
-            price_a_usdt = self.bybit.usdt_pairs.get(coin_a)
-            price_b_usdt = self.bybit.usdt_pairs.get(coin_b)
+            return {**cached_result, 'timestamp': self._scan_timestamp}
 
-            if not validate_price(price_a_usdt, f"цена {coin_a}"):
-                return None
-            if not validate_price(price_b_usdt, f"цена {coin_b}"):
-                return None
+        give_rate = best_rate.rankrate
+        if not validate_rate(give_rate):
+            return None
 
-            # Получаем курс от BestChange
-            best_rate = self.bestchange.get_best_rate(coin_a, coin_b, min_reserve)
-            if not best_rate:
-                return None
+        # Инвертируем для получения правильного курса обмена
+        exchange_rate = 1.0 / give_rate
 
-            give_rate = best_rate.rankrate
-            if not validate_rate(give_rate, f"курс {coin_a}→{coin_b}"):
-                return None
+        if not validate_rate(exchange_rate):
+            return None
 
-            # Инвертируем для получения правильного курса обмена
-            exchange_rate = 1.0 / give_rate
+        # === РАСЧЁТ С УЧЁТОМ ВСЕХ КОМИССИЙ BYBIT ===
 
-            if not validate_rate(exchange_rate, f"обменный курс {coin_a}→{coin_b}"):
-                return None
+        # Шаг 1: Покупаем coin_a за USDT на Bybit (Taker 0.18%)
+        amount_coin_a_gross = start_amount / price_a_usdt
+        
+        # Валидация результата деления
+        if not is_valid_number(amount_coin_a_gross):
+            return None
+        
+        fee_buy, amount_coin_a = self._calculate_bybit_fees(amount_coin_a_gross, is_taker=True)
+        
+        # Валидация результатов расчета комиссии
+        if not is_valid_number(amount_coin_a) or amount_coin_a <= 0:
+            return None
 
-            # === РАСЧЁТ С УЧЁТОМ ВСЕХ КОМИССИЙ BYBIT ===
+        # Шаг 2: Выводим coin_a с Bybit (withdrawal fee)
+        withdraw_fee_a_coin, withdraw_fee_a_usdt, withdraw_chain_a = self._get_withdrawal_fee_in_usdt(
+            coin_a, amount_coin_a, price_a_usdt
+        )
+        amount_coin_a_after_withdraw = amount_coin_a - withdraw_fee_a_coin
 
-            # Шаг 1: Покупаем coin_a за USDT на Bybit (Taker 0.18%)
-            amount_coin_a_gross = start_amount / price_a_usdt
-            
-            # Валидация результата деления
-            if not is_valid_number(amount_coin_a_gross):
-                return None
-            
-            fee_buy, amount_coin_a = self._calculate_bybit_fees(amount_coin_a_gross, is_taker=True)
-            
-            # Валидация результатов расчета комиссии
-            if not is_valid_number(amount_coin_a) or amount_coin_a <= 0:
-                return None
+        if amount_coin_a_after_withdraw <= 0:
+            return None
 
-            # Шаг 2: Выводим coin_a с Bybit (withdrawal fee)
-            withdraw_fee_a_coin, withdraw_fee_a_usdt, withdraw_chain_a = self._get_withdrawal_fee_in_usdt(
-                coin_a, amount_coin_a, price_a_usdt
-            )
-            amount_coin_a_after_withdraw = amount_coin_a - withdraw_fee_a_coin
+        # Проверка лимитов обменника - сразу, как известна сумма обмена,
+        # чтобы не считать продажу для пар, которые обменник всё равно не примет
+        if best_rate.give_min > 0 and amount_coin_a_after_withdraw < best_rate.give_min:
+            return None
+        if best_rate.give_max > 0 and amount_coin_a_after_withdraw > best_rate.give_max:
+            return None
 
-            if amount_coin_a_after_withdraw <= 0:
-                return None
+        # Шаг 3: Обмениваем coin_a на coin_b через BestChange (без комиссии от нас)
+        amount_coin_b = amount_coin_a_after_withdraw * exchange_rate
+        
+        # Валидация результата конвертации
+        if not is_valid_number(amount_coin_b) or amount_coin_b <= 0:
+            return None
 
-            # Шаг 3: Обмениваем coin_a на coin_b через BestChange (без комиссии от нас)
-            amount_coin_b = self.calculator.convert_amount(amount_coin_a_after_withdraw, exchange_rate)
-            
-            # Валидация результата конвертации
-            if not is_valid_number(amount_coin_b) or amount_coin_b <= 0:
-                return None
+        # Шаг 4: Вносим coin_b на Bybit (обычно без комиссии, но проверим минимум)
+        # Deposit обычно бесплатный, но учитываем минимальную сумму вывода с обменника
 
-            # Шаг 4: Вносим coin_b на Bybit (обычно без комиссии, но проверим минимум)
-            # Deposit обычно бесплатный, но учитываем минимальную сумму вывода с обменника
+        # Шаг 5: Выводим coin_b с обменника на Bybit (может быть комиссия обменника, но обычно включена в курс)
 
-            # Шаг 5: Выводим coin_b с обменника на Bybit (может быть комиссия обменника, но обычно включена в курс)
+        # Шаг 6: Продаём coin_b за USDT на Bybit (Taker 0.18%)
+        usdt_gross = amount_coin_b * price_b_usdt
+        
+        # Валидация
+        if not is_valid_number(usdt_gross) or usdt_gross <= 0:
+            return None
+        
+        fee_sell, usdt_after_sell = self._calculate_bybit_fees(usdt_gross, is_taker=True)
+        
+        # Валидация
+        if not is_valid_number(usdt_after_sell) or usdt_after_sell <= 0:
+            return None
 
-            # Шаг 6: Продаём coin_b за USDT на Bybit (Taker 0.18%)
-            usdt_gross = self.calculator.convert_amount(amount_coin_b, price_b_usdt)
-            
-            # Валидация
-            if not is_valid_number(usdt_gross) or usdt_gross <= 0:
-                return None
-            
-            fee_sell, usdt_after_sell = self._calculate_bybit_fees(usdt_gross, is_taker=True)
-            
-            # Валидация
-            if not is_valid_number(usdt_after_sell) or usdt_after_sell <= 0:
-                return None
-
-            # Шаг 7: Выводим USDT с Bybit (withdrawal fee) - НЕ УЧИТЫВАЕМ, т.к. конечный результат в USDT на Bybit
-            # Если бы выводили USDT, то нужно было бы вычесть комиссию
-            final_usdt = usdt_after_sell
-
-            # Общие комиссии Bybit
-            total_bybit_trading_fee = fee_buy * price_a_usdt + fee_sell
-            total_bybit_withdrawal_fee = withdraw_fee_a_usdt
-            total_bybit_fee = total_bybit_trading_fee + total_bybit_withdrawal_fee
-
-            # Проверка лимитов обменника
-            if best_rate.give_min > 0 and amount_coin_a_after_withdraw < best_rate.give_min:
-                return None
-            if best_rate.give_max > 0 and amount_coin_a_after_withdraw > best_rate.give_max:
-                return None
-
-            # Расчёт прибыли и спреда с валидацией
-            profit = final_usdt - start_amount
-            
-            # Валидация прибыли
-            if not is_valid_number(profit):
-                return None
-            
-            # Проверка деления на ноль
-            if start_amount <= 0:
-                return None
-            
-            spread = (profit / start_amount) * 100
-            
-            # Валидация спреда
-            if not is_valid_number(spread) or math.isnan(spread) or math.isinf(spread):
-                return None
-
-            # Фильтрация
-            if spread < min_spread or spread > max_spread:
-                return None
-            if abs(spread) > 100:
-                return None
-            if profit < MIN_PROFIT_USD:
-                return None
-
-            # Возвращаем результат
-            return {
-                'type': 'bestchange_arbitrage',
-                'path': f"USDT → {coin_a} → {coin_b} → USDT",
-                'scheme': f"Bybit → BestChange → Bybit",
-                'coins': [coin_a, coin_b],
-                'initial': start_amount,
-                'final': final_usdt,
-                'profit': profit,
-                'spread': spread,
-                'exchanger': best_rate.exchanger,
-                'exchanger_id': best_rate.exchanger_id,
-                'reserve': best_rate.reserve,
-                'give_min': best_rate.give_min,
-                'give_max': best_rate.give_max,
-                'liquidity_a': self.bybit.get_liquidity_score(coin_a, 'USDT'),
-                'liquidity_b': self.bybit.get_liquidity_score(coin_b, 'USDT'),
-                'volume_a': self.bybit.get_volume_24h(coin_a, 'USDT'),
-                'volume_b': self.bybit.get_volume_24h(coin_b, 'USDT'),
-                'bybit_url_a': self._get_bybit_trade_url(coin_a),
-                'bybit_url_b': self._get_bybit_trade_url(coin_b),
-                'bybit_deposit_url': self._get_bybit_deposit_url(),
-                'bybit_withdraw_url': self._get_bybit_withdraw_url(),
-                'exchanger_url': self._get_bestchange_exchanger_url(best_rate.exchanger_id),
-                'bybit_fee_buy': fee_buy * price_a_usdt,
-                'bybit_fee_sell': fee_sell,
-                'bybit_trading_fee': total_bybit_trading_fee,
-                'bybit_withdrawal_fee_a': withdraw_fee_a_usdt,
-                'bybit_withdrawal_fee_a_coin': withdraw_fee_a_coin,
-                'bybit_withdrawal_chain_a': withdraw_chain_a,
-                'bybit_total_fee': total_bybit_fee,
-                'steps': [
-                    f"1️⃣  Купить {amount_coin_a_gross:.8f} {coin_a} за {start_amount:.2f} USDT на Bybit (цена: ${price_a_usdt:.8f})",
-                    f"    💳 Комиссия торговли Bybit (Taker 0.18%): {fee_buy:.8f} {coin_a} (${fee_buy * price_a_usdt:.4f})",
-                    f"    ✅ Получено: {amount_coin_a:.8f} {coin_a}",
-                    f"2️⃣  Вывести {amount_coin_a:.8f} {coin_a} с Bybit",
-                    f"    💳 Комиссия на вывод Bybit ({withdraw_chain_a}): {withdraw_fee_a_coin:.8f} {coin_a} (${withdraw_fee_a_usdt:.4f})",
-                    f"    ✅ Выведено: {amount_coin_a_after_withdraw:.8f} {coin_a}",
-                    f"3️⃣  Обменять {amount_coin_a_after_withdraw:.8f} {coin_a} → {amount_coin_b:.8f} {coin_b} на {best_rate.exchanger}",
-                    f"    📊 Курс GET: 1 {coin_a} = {exchange_rate:.8f} {coin_b}",
-                    f"4️⃣  Внести {amount_coin_b:.8f} {coin_b} на Bybit (обычно без комиссии)",
-                    f"5️⃣  Продать {amount_coin_b:.8f} {coin_b} за {usdt_gross:.2f} USDT на Bybit (цена: ${price_b_usdt:.8f})",
-                    f"    💳 Комиссия торговли Bybit (Taker 0.18%): ${fee_sell:.4f}",
-                    f"    ✅ Получено: {final_usdt:.2f} USDT",
-                    f"",
-                    f"💰 ИТОГО комиссий Bybit:",
-                    f"   • Торговые: ${total_bybit_trading_fee:.4f}",
-                    f"   • Вывод {coin_a}: ${withdraw_fee_a_usdt:.4f}",
-                    f"   • Всего: ${total_bybit_fee:.4f}",
-                    f"✅ ЧИСТАЯ ПРИБЫЛЬ: {start_amount:.2f} USDT → {final_usdt:.2f} USDT (+{profit:.2f} USDT, {spread:.4f}%)"
-                ],
-                'exchange_rate': exchange_rate,
-                'give_rate': give_rate,
-                'bybit_rate_a': price_a_usdt,
-                'bybit_rate_b': price_b_usdt,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # Сохраняем в кэш перед возвратом
-            self.pair_check_cache.put(cache_key, result)
-            return result
+        # Шаг 7: Выводим USDT с Bybit (withdrawal fee) - НЕ УЧИТЫВАЕМ, т.к. конечный результат в USDT на Bybit
+        # Если бы выводили USDT, то нужно было бы вычесть комиссию
+        final_usdt = usdt_after_sell
+
+        # Расчёт прибыли и спреда с валидацией
+        profit = final_usdt - start_amount
+        
+        # Валидация прибыли
+        if not is_valid_number(profit):
+            return None
+        
+        # Проверка деления на ноль
+        if start_amount <= 0:
+            return None
+        
+        spread = (profit / start_amount) * 100
+        
+        # Валидация спреда (is_valid_number уже отсекает NaN, Infinity и спред <= 0)
+        if not is_valid_number(spread):
+            return None
 
-        except (ZeroDivisionError, ValueError, TypeError, KeyError) as e:
-            # Специфичная обработка известных ошибок
+        # Фильтрация одним цепным сравнением: спред положителен, поэтому
+        # abs(spread) > 100 сводится к верхней границе
+        if not min_spread <= spread <= max_spread or spread > 100:
             return None
-        except Exception:
-            # Общая обработка остальных ошибок
+        if profit < MIN_PROFIT_USD:
             return None
 
+        # Полный результат (ссылки, шаги, статистика) собирается только для прошедших фильтры
+        result = self._build_opportunity(
+            coin_a, coin_b, start_amount, best_rate, price_a_usdt, price_b_usdt,
+            amount_coin_a_gross, fee_buy, amount_coin_a,
+            withdraw_fee_a_coin, withdraw_fee_a_usdt, withdraw_chain_a,
+            amount_coin_a_after_withdraw, exchange_rate, amount_coin_b,
+            usdt_gross, fee_sell, final_usdt, profit, spread
+        )
+
+        # Сохраняем в кэш перед возвратом
+        self.pair_check_cache.put(cache_key, result)
+        return result
+
+
+    def _build_opportunity(
+            self,
+            coin_a: str,
+            coin_b: str,
+            start_amount: float,
+            best_rate,
+            price_a_usdt: float,
+            price_b_usdt: float,
+            amount_coin_a_gross: float,
+            fee_buy: float,
+            amount_coin_a: float,
+            withdraw_fee_a_coin: float,
+            withdraw_fee_a_usdt: float,
+            withdraw_chain_a: str,
+            amount_coin_a_after_withdraw: float,
+            exchange_rate: float,
+            amount_coin_b: float,
+            usdt_gross: float,
+            fee_sell: float,
+            final_usdt: float,
+            profit: float,
+            spread: float
+    ) -> Dict:
+        """
+        Собирает полный результат для связки, прошедшей все фильтры
+
+        Вынесено из _check_single_pair: ссылки и статистика ликвидности нужны
+        только для найденных связок, а не для каждой проверки
+        """
+        liquidity_a, volume_a = self._get_coin_stats(coin_a)
+        liquidity_b, volume_b = self._get_coin_stats(coin_b)
+
+        # Общие комиссии Bybit
+        total_bybit_trading_fee = fee_buy * price_a_usdt + fee_sell
+        total_bybit_withdrawal_fee = withdraw_fee_a_usdt
+        total_bybit_fee = total_bybit_trading_fee + total_bybit_withdrawal_fee
+
+        return {
+            'type': 'bestchange_arbitrage',
+            'path': f"USDT → {coin_a} → {coin_b} → USDT",
+            'scheme': self.SCHEME,
+            'coins': [coin_a, coin_b],
+            'initial': start_amount,
+            'final': final_usdt,
+            'profit': profit,
+            'spread': spread,
+            'exchanger': best_rate.exchanger,
+            'exchanger_id': best_rate.exchanger_id,
+            'reserve': best_rate.reserve,
+            'give_min': best_rate.give_min,
+            'give_max': best_rate.give_max,
+            'liquidity_a': liquidity_a,
+            'liquidity_b': liquidity_b,
+            'volume_a': volume_a,
+            'volume_b': volume_b,
+            'bybit_url_a': self._get_bybit_trade_url(coin_a),
+            'bybit_url_b': self._get_bybit_trade_url(coin_b),
+            'bybit_deposit_url': self.BYBIT_DEPOSIT_URL,
+            'bybit_withdraw_url': self.BYBIT_WITHDRAW_URL,
+            'exchanger_url': self._get_bestchange_exchanger_url(best_rate.exchanger_id),
+            'bybit_fee_buy': fee_buy * price_a_usdt,
+            'bybit_fee_sell': fee_sell,
+            'bybit_trading_fee': total_bybit_trading_fee,
+            'bybit_withdrawal_fee_a': withdraw_fee_a_usdt,
+            'bybit_withdrawal_fee_a_coin': withdraw_fee_a_coin,
+            'bybit_withdrawal_chain_a': withdraw_chain_a,
+            'bybit_total_fee': total_bybit_fee,
+            # Сырые суммы по шагам: текстовые шаги собираются в materialize_steps()
+            # только для выводимых связок, а не для каждой найденной
+            'amount_a_gross': amount_coin_a_gross,
+            'fee_buy_coin': fee_buy,
+            'amount_a': amount_coin_a,
+            'amount_a_withdrawn': amount_coin_a_after_withdraw,
+            'amount_b': amount_coin_b,
+            'usdt_gross': usdt_gross,
+            'exchange_rate': exchange_rate,
+            'give_rate': best_rate.rankrate,
+            'bybit_rate_a': price_a_usdt,
+            'bybit_rate_b': price_b_usdt,
+            'timestamp': self._scan_timestamp
+        }
+
+    @staticmethod
+    def materialize_steps(opp: Dict) -> List[str]:
+        """
+        Собирает текстовые шаги связки по сохранённым суммам
+
+        Форматирование откладывается до вывода: из всех найденных связок
+        печатаются только новые, поэтому строки строятся лишь для них.
+        Результат сохраняется в opp['steps']
+        """
+        steps = opp.get('steps')
+        if steps is not None:
+            return steps
+
+        coin_a, coin_b = opp['coins'][0], opp['coins'][1]
+        start_amount = opp['initial']
+        final_usdt = opp['final']
+        withdraw_fee_a_usdt = opp['bybit_withdrawal_fee_a']
+        amount_coin_a = opp['amount_a']
+        amount_coin_a_after_withdraw = opp['amount_a_withdrawn']
+        amount_coin_b = opp['amount_b']
+
+        steps = [
+            f"1️⃣  Купить {opp['amount_a_gross']:.8f} {coin_a} за {start_amount:.2f} USDT на Bybit (цена: ${opp['bybit_rate_a']:.8f})",
+            f"    💳 Комиссия торговли Bybit (Taker 0.18%): {opp['fee_buy_coin']:.8f} {coin_a} (${opp['bybit_fee_buy']:.4f})",
+            f"    ✅ Получено: {amount_coin_a:.8f} {coin_a}",
+            f"2️⃣  Вывести {amount_coin_a:.8f} {coin_a} с Bybit",
+            f"    💳 Комиссия на вывод Bybit ({opp['bybit_withdrawal_chain_a']}): {opp['bybit_withdrawal_fee_a_coin']:.8f} {coin_a} (${withdraw_fee_a_usdt:.4f})",
+            f"    ✅ Выведено: {amount_coin_a_after_withdraw:.8f} {coin_a}",
+            f"3️⃣  Обменять {amount_coin_a_after_withdraw:.8f} {coin_a} → {amount_coin_b:.8f} {coin_b} на {opp['exchanger']}",
+            f"    📊 Курс GET: 1 {coin_a} = {opp['exchange_rate']:.8f} {coin_b}",
+            f"4️⃣  Внести {amount_coin_b:.8f} {coin_b} на Bybit (обычно без комиссии)",
+            f"5️⃣  Продать {amount_coin_b:.8f} {coin_b} за {opp['usdt_gross']:.2f} USDT на Bybit (цена: ${opp['bybit_rate_b']:.8f})",
+            f"    💳 Комиссия торговли Bybit (Taker 0.18%): ${opp['bybit_fee_sell']:.4f}",
+            f"    ✅ Получено: {final_usdt:.2f} USDT",
+            f"",
+            f"💰 ИТОГО комиссий Bybit:",
+            f"   • Торговые: ${opp['bybit_trading_fee']:.4f}",
+            f"   • Вывод {coin_a}: ${withdraw_fee_a_usdt:.4f}",
+            f"   • Всего: ${opp['bybit_total_fee']:.4f}",
+            f"✅ ЧИСТАЯ ПРИБЫЛЬ: {start_amount:.2f} USDT → {final_usdt:.2f} USDT (+{opp['profit']:.2f} USDT, {opp['spread']:.4f}%)"
+        ]
+        opp['steps'] = steps
+        return steps
+
     def _print_opportunity(self, opp: Dict, rank: int):
-        """Выводит найденную возможность сразу в консоль"""
-        print(f"\n🎯 НАЙДЕНА СВЯЗКА #{rank} через BestChange")
-        print(f"   📍 Путь: {opp['path']}")
-        print(f"   🔗 Bybit {opp['coins'][0]}/USDT: {opp['bybit_url_a']}")
-        print(f"   🔗 Bybit {opp['coins'][1]}/USDT: {opp['bybit_url_b']}")
-        print(f"   🔗 Обменник: {opp['exchanger_url']}")
-        print(f"   💰 Спред: {opp['spread']:.4f}% | Прибыль: ${opp['profit']:.4f}")
-        print(f"   💳 Комиссии Bybit: ${opp['bybit_total_fee']:.4f}")
-        print(f"      • Торговые: ${opp['bybit_trading_fee']:.4f}")
-        print(
-            f"      • Вывод {opp['coins'][0]} ({opp['bybit_withdrawal_chain_a']}): ${opp['bybit_withdrawal_fee_a']:.4f}")
-        print(f"   🏦 Обменник: {opp['exchanger']} (резерв: ${opp['reserve']:,.0f})")
-        print(
-            f"   💧 Ликвидность: {opp['coins'][0]} ({opp['liquidity_a']:.1f}) → {opp['coins'][1]} ({opp['liquidity_b']:.1f})")
-        print(f"   📊 Курс GET: 1 {opp['coins'][0]} = {opp['exchange_rate']:.8f} {opp['coins'][1]}")
-        print("-" * 100)
+        """Выводит найденную возможность сразу в консоль (одной записью в stdout)"""
+        coin_a, coin_b = opp['coins'][0], opp['coins'][1]
+        print("\n".join((
+            f"\n🎯 НАЙДЕНА СВЯЗКА #{rank} через BestChange",
+            f"   📍 Путь: {opp['path']}",
+            f"   🔗 Bybit {coin_a}/USDT: {opp['bybit_url_a']}",
+            f"   🔗 Bybit {coin_b}/USDT: {opp['bybit_url_b']}",
+            f"   🔗 Обменник: {opp['exchanger_url']}",
+            f"   💰 Спред: {opp['spread']:.4f}% | Прибыль: ${opp['profit']:.4f}",
+            f"   💳 Комиссии Bybit: ${opp['bybit_total_fee']:.4f}",
+            f"      • Торговые: ${opp['bybit_trading_fee']:.4f}",
+            f"      • Вывод {coin_a} ({opp['bybit_withdrawal_chain_a']}): ${opp['bybit_withdrawal_fee_a']:.4f}",
+            f"   🏦 Обменник: {opp['exchanger']} (резерв: ${opp['reserve']:,.0f})",
+            f"   💧 Ликвидность: {coin_a} ({opp['liquidity_a']:.1f}) → {coin_b} ({opp['liquidity_b']:.1f})",
+            f"   📊 Курс GET: 1 {coin_a} = {opp['exchange_rate']:.8f} {coin_b}",
+            "-" * 100
+        )))
 
     def _update_hot_pairs_cache(self, opportunities: List[Dict]):
         """Обновляет кэш горячих пар с TTL"""
         if not opportunities:
             return
         
-        # Оптимизированная сортировка - только по прибыли
-        sorted_opps = sorted(opportunities, key=lambda x: x.get('profit', 0), reverse=True)
+        # Нужны только CACHE_HOT_PAIRS лучших по прибыли - частичная выборка вместо полной сортировки
+        top_opps = heapq.nlargest(CACHE_HOT_PAIRS, opportunities, key=lambda x: x.get('profit', 0))
         
         # Очищаем старые записи
         self.hot_pairs_cache.cleanup_expired()
 
         # Добавляем новые горячие пары
         added_count = 0
-        for opp in sorted_opps[:CACHE_HOT_PAIRS]:
+        now = datetime.now()
+        for opp in top_opps:
             if 'coins' not in opp or len(opp['coins']) < 2:
                 continue
             
-            pair = tuple(opp['coins'])
-            # Сохраняем как строку для удобства
-            cache_key = f"({pair[0]}, {pair[1]})"
+            # Ключ - сам кортеж пары: не нужно собирать и потом разбирать строку
+            cache_key = (opp['coins'][0], opp['coins'][1])
             cache_data = {
                 'last_spread': opp.get('spread', 0),
                 'last_profit': opp.get('profit', 0),
-                'last_check': datetime.now()
+                'last_check': now
             }
             
             self.hot_pairs_cache.put(cache_key, cache_data)
@@ -580,16 +888,18 @@ class ExchangeArbitrageAnalyzer:
             if not top_rates:
                 return {'error': f'BestChange не поддерживает {coin_a} → {coin_b}'}
 
+            # Курсы GET (1 / rankrate) считаются один раз и используются и для вывода,
+            # и для итогового расчёта, и для списка обменников в результате
+            get_rates = [1.0 / rate.rankrate if rate.rankrate > 0 else 0 for rate in top_rates]
+
             print(f"   ✓ Найдено {len(top_rates)} обменников:")
-            for idx, rate in enumerate(top_rates, 1):
-                get_rate = 1.0 / rate.rankrate if rate.rankrate > 0 else 0
+            for idx, (rate, get_rate) in enumerate(zip(top_rates, get_rates), 1):
                 amount_b = amount_after_withdraw * get_rate
                 print(
                     f"      {idx}. {rate.exchanger}: курс GET 1 {coin_a} = {get_rate:.8f} {coin_b} → {amount_b:.8f} {coin_b} (резерв: ${rate.reserve:,.0f})")
 
             best_rate = top_rates[0]
-            get_rate = 1.0 / best_rate.rankrate if best_rate.rankrate > 0 else 0
-            amount_coin_b = amount_after_withdraw * get_rate
+            amount_coin_b = amount_after_withdraw * get_rates[0]
 
             price_b_usdt = self.bybit.usdt_pairs.get(coin_b)
             if not price_b_usdt:
@@ -613,8 +923,8 @@ class ExchangeArbitrageAnalyzer:
                 'exchanger': best_rate.exchanger,
                 'withdrawal_fee': withdraw_fee_usdt,
                 'top_exchangers': [
-                    {'name': r.exchanger, 'rate': 1.0 / r.rankrate if r.rankrate > 0 else 0, 'reserve': r.reserve}
-                    for r in top_rates
+                    {'name': r.exchanger, 'rate': get_rate, 'reserve': r.reserve}
+                    for r, get_rate in zip(top_rates, get_rates)
                 ]
             }
 
@@ -626,55 +936,27 @@ class ExchangeArbitrageAnalyzer:
         """Возвращает список горячих пар из кэша"""
         # Очищаем истекшие записи
         self.hot_pairs_cache.cleanup_expired()
-        
-        hot_pairs = []
-        hot_pairs_set = set()  # Для быстрой проверки дубликатов
-        
-        # Проходим по всем ключам в кэше
-        for key in list(self.hot_pairs_cache.cache.keys()):
-            cached_data = self.hot_pairs_cache.get(key)
-            if cached_data is not None:
-                try:
-                    pair = None
-                    
-                    # Ключ хранится как строка вида "(coin_a, coin_b)"
-                    if isinstance(key, str):
-                        key = key.strip()
-                        if key.startswith('(') and key.endswith(')'):
-                            # Убираем скобки и разбиваем
-                            content = key[1:-1].strip()
-                            parts = [p.strip().strip("'\"") for p in content.split(',')]
-                            if len(parts) == 2:
-                                pair = (parts[0], parts[1])
-                    elif isinstance(key, tuple) and len(key) == 2:
-                        # Если ключ уже tuple
-                        pair = key
-                    
-                    # Добавляем если валидная пара и еще не добавлена
-                    if pair and isinstance(pair, tuple) and len(pair) == 2:
-                        if pair not in hot_pairs_set:
-                            hot_pairs.append(pair)
-                            hot_pairs_set.add(pair)
-                except Exception:
-                    continue
-        
-        return hot_pairs
+
+        # Ключи кэша - кортежи (coin_a, coin_b), после очистки все записи актуальны
+        return list(self.hot_pairs_cache.cache)
 
     def get_pair_statistics(self) -> Dict:
         """Возвращает статистику по парам"""
         stats = {
             'total_pairs_checked': len(self.pair_performance),
+            'prefiltered_pairs': self.prefiltered_pairs,
             'hot_pairs_cached': len(self.hot_pairs_cache),
             'top_performers': []
         }
 
-        sorted_pairs = sorted(
+        # Нужны только 10 лучших - частичная выборка вместо сортировки всех пар
+        top_pairs = heapq.nlargest(
+            10,
             self.pair_performance.items(),
-            key=lambda x: x[1]['finds'] / max(x[1]['checks'], 1),
-            reverse=True
-        )[:10]
+            key=lambda x: x[1]['finds'] / max(x[1]['checks'], 1)
+        )
 
-        for pair, perf in sorted_pairs:
+        for pair, perf in top_pairs:
             stats['top_performers'].append({
                 'pair': f"{pair[0]} → {pair[1]}",
                 'finds': perf['finds'],
@@ -2,11 +2,14 @@
 Модуль для логирования найденных арбитражных возможностей
 """
 
+import csv
+import heapq
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 from configs_continuous import LOGS_DIR, SAVE_OPPORTUNITIES_TO_FILE
+from utils import json_dumps, json_loads
 
 
 class OpportunityLogger:
@@ -50,7 +53,7 @@ class OpportunityLogger:
 
             # Записываем в файл
             with open(self.opportunities_log, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+                f.write(json_dumps(log_entry) + '\n')
 
             # Сохраняем в памяти для статистики
             self.session_opportunities.append(log_entry)
@@ -89,39 +92,35 @@ class OpportunityLogger:
             'best_opportunity': self.best_opportunity
         }
 
-        # Статистика по обменникам
+        # Статистика по обменникам и монетам - за один проход по записям сессии
         if self.session_opportunities:
             exchangers = {}
+            coins = {}
             for entry in self.session_opportunities:
                 opp = entry['opportunity']
                 ex = opp.get('exchanger', 'Unknown')
-                if ex not in exchangers:
-                    exchangers[ex] = {'count': 0, 'total_profit': 0, 'max_spread': 0}
-                exchangers[ex]['count'] += 1
-                exchangers[ex]['total_profit'] += opp['profit']
-                exchangers[ex]['max_spread'] = max(exchangers[ex]['max_spread'], opp['spread'])
-
-            stats['top_exchangers'] = sorted(
-                exchangers.items(),
-                key=lambda x: x[1]['count'],
-                reverse=True
-            )[:5]
+                ex_stats = exchangers.get(ex)
+                if ex_stats is None:
+                    ex_stats = exchangers[ex] = {'count': 0, 'total_profit': 0, 'max_spread': 0}
+                ex_stats['count'] += 1
+                ex_stats['total_profit'] += opp['profit']
+                ex_stats['max_spread'] = max(ex_stats['max_spread'], opp['spread'])
 
-        # Статистика по монетам
-        if self.session_opportunities:
-            coins = {}
-            for entry in self.session_opportunities:
-                opp = entry['opportunity']
                 for coin in opp.get('coins', []):
-                    if coin not in coins:
-                        coins[coin] = 0
-                    coins[coin] += 1
+                    coins[coin] = coins.get(coin, 0) + 1
 
-            stats['top_coins'] = sorted(
+            # Нужны только первые 5/10 - выбор через кучу, без полной сортировки
+            stats['top_exchangers'] = heapq.nlargest(
+                5,
+                exchangers.items(),
+                key=lambda x: x[1]['count']
+            )
+
+            stats['top_coins'] = heapq.nlargest(
+                10,
                 coins.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]
+                key=lambda x: x[1]
+            )
 
         return stats
 
@@ -148,31 +147,35 @@ class OpportunityLogger:
         """Выводит сводку по текущей сессии"""
         stats = self.get_session_statistics()
 
-        print(f"\n{'='*100}")
-        print(f"📊 СТАТИСТИКА СЕССИИ")
-        print(f"{'='*100}")
-        print(f"⏱️  Время работы: {stats['uptime_hours']:.1f} часов")
-        print(f"🎯 Связок найдено: {stats['total_opportunities']}")
+        # Сводка собирается в список строк и выводится одной записью в stdout
+        lines = [
+            f"\n{'='*100}",
+            f"📊 СТАТИСТИКА СЕССИИ",
+            f"{'='*100}",
+            f"⏱️  Время работы: {stats['uptime_hours']:.1f} часов",
+            f"🎯 Связок найдено: {stats['total_opportunities']}",
+        ]
 
         if stats['total_opportunities'] > 0:
-            print(f"🏆 Лучший спред: {stats['best_spread']:.4f}%")
+            lines.append(f"🏆 Лучший спред: {stats['best_spread']:.4f}%")
 
             if stats['best_opportunity']:
-                print(f"   Путь: {stats['best_opportunity']['path']}")
-                print(f"   Прибыль: ${stats['best_opportunity']['profit']:.4f}")
-                print(f"   Обменник: {stats['best_opportunity']['exchanger']}")
+                lines.append(f"   Путь: {stats['best_opportunity']['path']}")
+                lines.append(f"   Прибыль: ${stats['best_opportunity']['profit']:.4f}")
+                lines.append(f"   Обменник: {stats['best_opportunity']['exchanger']}")
 
         if 'top_exchangers' in stats and stats['top_exchangers']:
-            print(f"\n🏦 ТОП-5 ОБМЕННИКОВ:")
+            lines.append(f"\n🏦 ТОП-5 ОБМЕННИКОВ:")
             for ex, ex_stats in stats['top_exchangers']:
-                print(f"   {ex}: {ex_stats['count']} связок, макс. спред {ex_stats['max_spread']:.4f}%")
+                lines.append(f"   {ex}: {ex_stats['count']} связок, макс. спред {ex_stats['max_spread']:.4f}%")
 
         if 'top_coins' in stats and stats['top_coins']:
-            print(f"\n💰 ТОП-10 МОНЕТ:")
+            lines.append(f"\n💰 ТОП-10 МОНЕТ:")
             for coin, count in stats['top_coins']:
-                print(f"   {coin}: {count} появлений")
+                lines.append(f"   {coin}: {count} появлений")
 
-        print(f"{'='*100}\n")
+        lines.append(f"{'='*100}\n")
+        print("\n".join(lines))
 
     def load_recent_opportunities(self, hours: int = 24) -> List[Dict]:
         """
@@ -194,7 +197,7 @@ class OpportunityLogger:
             with open(self.opportunities_log, 'r', encoding='utf-8') as f:
                 for line in f:
                     try:
-                        entry = json.loads(line.strip())
+                        entry = json_loads(line.strip())
                         entry_time = datetime.fromisoformat(entry['timestamp']).timestamp()
 
                         if entry_time >= cutoff_time:
@@ -221,41 +224,46 @@ class OpportunityLogger:
         print(f"{'='*100}")
         print(f"📊 Всего записей: {len(opportunities)}")
 
+        # Спреды, обменники, монеты и распределение по часам - за один проход
+        total_spread = 0
+        max_spread = float('-inf')
+        exchangers = {}
+        coins = {}
+        hourly_distribution = {}
+        for entry in opportunities:
+            opp = entry['opportunity']
+            spread = opp['spread']
+            total_spread += spread
+            if spread > max_spread:
+                max_spread = spread
+
+            ex = opp.get('exchanger', 'Unknown')
+            exchangers[ex] = exchangers.get(ex, 0) + 1
+
+            for coin in opp.get('coins', []):
+                coins[coin] = coins.get(coin, 0) + 1
+
+            hour = datetime.fromisoformat(entry['timestamp']).hour
+            hourly_distribution[hour] = hourly_distribution.get(hour, 0) + 1
+
         # Средний спред
-        spreads = [opp['opportunity']['spread'] for opp in opportunities]
-        avg_spread = sum(spreads) / len(spreads) if spreads else 0
-        max_spread = max(spreads) if spreads else 0
+        avg_spread = total_spread / len(opportunities)
 
         print(f"💰 Средний спред: {avg_spread:.4f}%")
         print(f"🏆 Максимальный спред: {max_spread:.4f}%")
 
         # Топ обменники
-        exchangers = {}
-        for entry in opportunities:
-            ex = entry['opportunity'].get('exchanger', 'Unknown')
-            exchangers[ex] = exchangers.get(ex, 0) + 1
-
         print(f"\n🏦 САМЫЕ АКТИВНЫЕ ОБМЕННИКИ:")
-        for ex, count in sorted(exchangers.items(), key=lambda x: x[1], reverse=True)[:5]:
+        for ex, count in heapq.nlargest(5, exchangers.items(), key=lambda x: x[1]):
             percentage = (count / len(opportunities)) * 100
             print(f"   {ex}: {count} связок ({percentage:.1f}%)")
 
         # Топ монеты
-        coins = {}
-        for entry in opportunities:
-            for coin in entry['opportunity'].get('coins', []):
-                coins[coin] = coins.get(coin, 0) + 1
-
         print(f"\n💎 САМЫЕ ПОПУЛЯРНЫЕ МОНЕТЫ:")
-        for coin, count in sorted(coins.items(), key=lambda x: x[1], reverse=True)[:10]:
+        for coin, count in heapq.nlargest(10, coins.items(), key=lambda x: x[1]):
             print(f"   {coin}: {count} появлений")
 
         # Временное распределение (по часам)
-        hourly_distribution = {}
-        for entry in opportunities:
-            hour = datetime.fromisoformat(entry['timestamp']).hour
-            hourly_distribution[hour] = hourly_distribution.get(hour, 0) + 1
-
         print(f"\n⏰ РАСПРЕДЕЛЕНИЕ ПО ЧАСАМ:")
         for hour in sorted(hourly_distribution.keys()):
             count = hourly_distribution[hour]
@@ -276,8 +284,6 @@ class OpportunityLogger:
             return
 
         try:
-            import csv
-
             with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
                 writer = csv.writer(f)
 
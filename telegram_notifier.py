@@ -3,17 +3,9 @@
 """
 
 import aiohttp
-import asyncio
 from typing import Dict, Optional
-from configs_continuous import (
-    os, BASE_DIR, Path
-)
-
-# Загружаем переменные окружения
-ENV_PATH = BASE_DIR / ".env"
-if ENV_PATH.exists():
-    from dotenv import load_dotenv
-    load_dotenv(ENV_PATH)
+# .env уже загружен при импорте configs_continuous
+from configs_continuous import os
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
@@ -1,11 +1,32 @@
 """
 Утилиты для валидации данных и кэширования
 """
+import json
 import math
+import time
 from typing import Any, Optional, Dict
-from datetime import datetime, timedelta
 from collections import OrderedDict
 
+try:
+    import orjson
+except ImportError:  # orjson опционален - без него используется стандартный json
+    orjson = None
+
+
+# Быстрый парсер JSON для ответов API (orjson в 2-5 раз быстрее json.loads)
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def json_dumps(obj: Any) -> str:
+    """
+    Сериализует объект в однострочный JSON (не-ASCII символы без экранирования)
+
+    С orjson - в несколько раз быстрее json.dumps на словарях связок
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
 
 def is_valid_number(value: Any) -> bool:
     """
@@ -17,6 +38,11 @@ def is_valid_number(value: Any) -> bool:
     Returns:
         True если значение валидно, False иначе
     """
+    # Быстрый путь для float (почти все цены и курсы): одно цепное сравнение
+    # без try/except и приведения типа; NaN не проходит ни одно сравнение
+    if type(value) is float:
+        return 0.0 < value < math.inf
+
     if value is None:
         return False
     
@@ -76,9 +102,10 @@ class TTLCache:
             ttl_seconds: Время жизни записей в секундах
         """
         self.max_size = max_size
-        self.ttl = timedelta(seconds=ttl_seconds)
+        self.ttl = float(ttl_seconds)
         self.cache: OrderedDict = OrderedDict()
-        self.timestamps: Dict[str, datetime] = {}
+        # Время записи по монотонным часам (не зависит от перевода системного времени)
+        self.timestamps: Dict[str, float] = {}
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -95,7 +122,7 @@ class TTLCache:
         
         # Проверяем TTL
         if key in self.timestamps:
-            if datetime.now() - self.timestamps[key] > self.ttl:
+            if time.monotonic() - self.timestamps[key] > self.ttl:
                 # Истек срок - удаляем
                 del self.cache[key]
                 del self.timestamps[key]
@@ -125,7 +152,7 @@ class TTLCache:
                     del self.timestamps[oldest_key]
         
         self.cache[key] = value
-        self.timestamps[key] = datetime.now()
+        self.timestamps[key] = time.monotonic()
     
     def clear(self) -> None:
         """Очищает весь кэш"""
@@ -135,6 +162,9 @@ class TTLCache:
     def size(self) -> int:
         """Возвращает текущий размер кэша"""
         return len(self.cache)
+
+    def __len__(self) -> int:
+        return len(self.cache)
     
     def cleanup_expired(self) -> int:
         """
@@ -143,7 +173,7 @@ class TTLCache:
         Returns:
             Количество удаленных записей
         """
-        now = datetime.now()
+        now = time.monotonic()
         expired_keys = [
             key for key, timestamp in self.timestamps.items()
             if now - timestamp > self.ttl
@@ -157,66 +187,3 @@ class TTLCache:
         
         return len(expired_keys)
 
-
-class MemoizedCalculator:
-    """
-    Мемоизация для частых расчетов (комиссии, конвертации)
-    """
-    
-    def __init__(self, cache_size: int = 500, ttl_seconds: int = 60):
-        """
-        Args:
-            cache_size: Размер кэша
-            ttl_seconds: Время жизни записей
-        """
-        self.cache = TTLCache(max_size=cache_size, ttl_seconds=ttl_seconds)
-    
-    def calculate_fee(self, amount: float, fee_rate: float) -> tuple:
-        """
-        Рассчитывает комиссию с мемоизацией
-        
-        Args:
-            amount: Сумма
-            fee_rate: Ставка комиссии
-            
-        Returns:
-            (комиссия, сумма_после_комиссии)
-        """
-        # Создаем ключ с округлением для кэширования
-        cache_key = f"fee_{amount:.8f}_{fee_rate:.8f}"
-        cached = self.cache.get(cache_key)
-        
-        if cached is not None:
-            return cached
-        
-        fee_amount = amount * fee_rate
-        amount_after_fee = amount - fee_amount
-        result = (fee_amount, amount_after_fee)
-        
-        self.cache.put(cache_key, result)
-        return result
-    
-    def convert_amount(self, amount: float, rate: float) -> float:
-        """
-        Конвертирует сумму по курсу с мемоизацией
-        
-        Args:
-            amount: Сумма
-            rate: Курс
-            
-        Returns:
-            Конвертированная сумма
-        """
-        cache_key = f"convert_{amount:.8f}_{rate:.8f}"
-        cached = self.cache.get(cache_key)
-        
-        if cached is not None:
-            return cached
-        
-        result = amount * rate
-        self.cache.put(cache_key, result)
-        return result
-    
-    def cleanup(self) -> int:
-        """Очищает истекшие записи"""
-        return self.cache.cleanup_expired()